@@ -41,6 +41,29 @@ interface BackendModel {
   nsfwLevel?: number;
 }
 
+// 筛选维度的分面计数
+export interface ModelFacets {
+  total: number;
+  type: Record<string, number>;
+  baseModel: Record<string, number>;
+  nsfw: Record<string, number>;
+  root: Record<string, number>;
+  precision: Record<string, number>;
+}
+
+export interface ModelTag {
+  tag: string;
+  trigger: boolean;
+  count: number;
+}
+
+export interface ModelTags {
+  path: string;
+  name: string;
+  trigger_words: string[];
+  tags: ModelTag[];
+}
+
 // 转换后端模型格式为前端格式
 function convertModel(backendModel: BackendModel): Model {
   // 提取文件名
@@ -100,6 +123,30 @@ export const ModelsAPI = {
     return (response.data as BackendModel[]).map(convertModel);
   },
 
+  // 获取筛选分面计数
+  getFacets: async (): Promise<ModelFacets> => {
+    const response = await apiClient.get('/models/facets');
+    return response.data;
+  },
+
+  // 全文搜索模型（名称、文件名、标签、触发词、描述）
+  searchModels: async (query: string, limit = 50): Promise<Model[]> => {
+    const response = await apiClient.get('/models/search', { params: { q: query, limit } });
+    return (response.data.items as BackendModel[]).map(convertModel);
+  },
+
+  // 获取模型的触发词和训练标签
+  getModelTags: async (modelId: string): Promise<ModelTags> => {
+    const response = await apiClient.get(`/models/${encodeURIComponent(modelId)}/tags`);
+    return response.data;
+  },
+
+  // 查找使用指定标签的模型
+  getModelsByTag: async (tag: string, limit = 100): Promise<Model[]> => {
+    const response = await apiClient.get('/tags/models', { params: { tag, limit } });
+    return (response.data.items as BackendModel[]).map(convertModel);
+  },
+
   // 扫描模型
   scanModels: async (): Promise<{ taskId: string }> => {
     // 关闭之前可能存在的EventSource连接
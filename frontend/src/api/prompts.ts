@@ -60,6 +60,19 @@ export interface TranslationResult {
   translated: string;
 }
 
+// 翻译缓存统计
+export interface TranslationCacheStats {
+  enabled: boolean;
+  memory_hits?: number;
+  disk_hits?: number;
+  misses?: number;
+  lookups?: number;
+  hit_rate?: number;
+  memory_entries?: number;
+  memory_size?: number;
+  disk_entries?: number;
+}
+
 // 提示词库项目接口
 export interface PromptLibraryItem {
   id: string;
@@ -77,6 +90,46 @@ export interface CreatePromptLibraryItemParams {
   subCategory: string;
 }
 
+// 提示词库分类树节点
+export interface PromptLibraryCategory {
+  name: string;
+  count: number;
+  subCategories: { name: string; count: number }[];
+}
+
+// 提示词库分类树
+export interface PromptLibraryCategoryTree {
+  total: number;
+  categories: PromptLibraryCategory[];
+}
+
+// 提示词库搜索结果
+export interface PromptLibrarySearchResult {
+  query: string;
+  total: number;
+  offset: number;
+  items: (PromptLibraryItem & { score?: number })[];
+}
+
+// 提示词库搜索参数
+export interface PromptLibrarySearchParams {
+  q?: string;
+  category?: string;
+  subCategory?: string;
+  offset?: number;
+  limit?: number;
+}
+
+// 提示词库批量导入结果
+export interface PromptLibraryImportResult {
+  added: number;
+  duplicates: number;
+  invalid: number;
+}
+
+// 提示词库导入文件格式
+export type PromptLibraryImportFormat = 'csv' | 'json' | 'ndjson' | 'danbooru';
+
 // 提示词API服务
 export const PromptsAPI = {
   // 获取所有提示词
@@ -142,6 +195,20 @@ export const PromptsAPI = {
     return response.data;
   },
   
+  // 获取翻译缓存命中统计
+  getTranslationCacheStats: async (): Promise<TranslationCacheStats> => {
+    const response = await apiClient.get('/translate/cache-stats');
+    return response.data;
+  },
+  
+  // 清除翻译缓存（指定文本时只删除该文本）
+  clearTranslationCache: async (text?: string, toEnglish: boolean = false): Promise<{ deleted: number }> => {
+    const response = await apiClient.delete('/translate/cache', {
+      params: text === undefined ? {} : { text, to_english: toEnglish }
+    });
+    return response.data;
+  },
+  
   // 批量翻译
   batchTranslate: async (texts: string[], toEnglish: boolean = false): Promise<TranslationResult[]> => {
     const response = await apiClient.post('/batch-translate', texts, {
@@ -158,6 +225,46 @@ export const PromptsAPI = {
     return response.data.items;
   },
   
+  // 按中文或英文完全匹配查找多个提示词，返回 文本 -> 库中项目（库中没有的文本不包含在内）
+  lookupPromptLibrary: async (texts: string[]): Promise<Record<string, PromptLibraryItem>> => {
+    if (texts.length === 0) return {};
+    const response = await apiClient.post('/prompt-library/lookup', { texts });
+    return response.data.items;
+  },
+  
+  // 获取提示词库分类树及数量
+  getPromptLibraryCategories: async (): Promise<PromptLibraryCategoryTree> => {
+    const response = await apiClient.get('/prompt-library/categories');
+    return response.data;
+  },
+  
+  // 搜索提示词库（服务端排序和分页）
+  searchPromptLibrary: async (params: PromptLibrarySearchParams): Promise<PromptLibrarySearchResult> => {
+    const response = await apiClient.get('/prompt-library/search', { params });
+    return response.data;
+  },
+  
+  // 批量导入提示词库，文件内容直接作为请求体上传
+  importPromptLibrary: async (
+    file: Blob,
+    format: PromptLibraryImportFormat,
+    category?: string,
+    subCategory?: string
+  ): Promise<PromptLibraryImportResult> => {
+    const response = await apiClient.post('/prompt-library/import', file, {
+      params: { format, category, subCategory },
+      headers: { 'Content-Type': 'application/octet-stream' }
+    });
+    return response.data;
+  },
+  
+  // 获取提示词库导出地址（由浏览器直接下载）
+  getPromptLibraryExportUrl: (format: 'json' | 'ndjson' | 'csv' = 'json', category?: string): string => {
+    const params = new URLSearchParams({ format });
+    if (category) params.set('category', category);
+    return `${apiClient.defaults.baseURL || ''}/prompt-library/export?${params.toString()}`;
+  },
+  
   // 保存提示词到库
   savePromptToLibrary: async (item: CreatePromptLibraryItemParams): Promise<PromptLibraryItem> => {
     const response = await apiClient.post('/prompt-library', item);
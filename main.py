@@ -8,7 +8,7 @@ import sys
 import asyncio
 from pathlib import Path
 
-from src.core.config_manager import ConfigManager
+from src.core.config_manager import get_config_manager
 from src.core.model_manager import ModelManager
 from src.api.model_api import create_api
 from src.api.comfyui_api import setup_comfyui_routes
@@ -16,9 +16,20 @@ from src.api.network_api import setup_network_routes
 from src.api.common_api import setup_common_routes
 from src.api.frontend_api import setup_frontend_routes
 from src.api.prompt_routes import setup_prompt_routes
-from src.api.webdav_api import router as webdav_router
+from src.api.events_api import setup_event_routes
+from src.api.integrity_api import setup_integrity_routes
+from src.api.conversion_api import setup_conversion_routes
+from src.api.download_api import setup_download_routes
+from src.api.model_update_api import setup_model_update_routes
+from src.api.usage_api import setup_usage_routes
+from src.api.webdav_api import router as webdav_router, init_webdav_api
 from src.api.system_api import router as system_router
 from src.services.backup_service import BackupService
+from src.services.integrity_service import IntegrityService
+from src.services.conversion_service import ConversionService
+from src.services.download_service import DownloadService
+from src.services.model_update_service import ModelUpdateService
+from src.services.usage_service import UsageService
 from src.utils.file_utils import find_free_port
 
 def open_browser(url: str):
@@ -53,6 +64,8 @@ if __name__ == "__main__":
     parser.add_argument('--dev', action='store_true', help='开发模式 (等同于 --frontend http://localhost:5173 --no-browser)')
     parser.add_argument('--config', default='config.json', help='配置文件路径')
     parser.add_argument('--no-backup', action='store_true', help='禁用自动备份服务')
+    parser.add_argument('--watch-config', action='store_true', help='配置文件被外部修改时自动重新加载')
+    parser.add_argument('--no-integrity', action='store_true', help='禁用后台完整性校验服务')
     args = parser.parse_args()
 
     # 获取可用端口
@@ -76,8 +89,8 @@ if __name__ == "__main__":
             # 没有前端，只使用API
             frontend_url = None
     
-    # 创建配置管理器
-    config_manager = ConfigManager(args.config)
+    # 创建共享的配置管理器，各模块通过 get_config_manager 获取同一实例
+    config_manager = get_config_manager(args.config)
     
     # 创建 ModelManager 实例，并传入配置管理器
     manager = ModelManager(args.config)
@@ -103,7 +116,11 @@ if __name__ == "__main__":
     # 设置提示词相关路由
     setup_prompt_routes(app)
     
+    # 设置实时事件推送路由
+    setup_event_routes(app, manager)
+    
     # 添加WebDAV备份路由
+    init_webdav_api(args.config)
     app.include_router(webdav_router)
     
     # 添加System API路由
@@ -123,6 +140,54 @@ if __name__ == "__main__":
             if backup_service:
                 await backup_service.stop()
     
+    # 监视配置文件的外部修改
+    if args.watch_config:
+        @app.on_event("startup")
+        async def start_config_watcher():
+            asyncio.create_task(config_manager.watch())
+    
+    # 模型精度转换任务
+    setup_conversion_routes(app, ConversionService(manager))
+    
+    # 模型下载任务
+    setup_download_routes(app, DownloadService(manager))
+    
+    # Civitai模型版本更新检查服务
+    update_service = ModelUpdateService(manager)
+    setup_model_update_routes(app, update_service)
+    
+    @app.on_event("startup")
+    async def start_model_update_service():
+        await update_service.start()
+        
+    @app.on_event("shutdown")
+    async def stop_model_update_service():
+        await update_service.stop()
+    
+    # 模型使用统计服务（扫描输出目录中的图片）
+    usage_service = UsageService(manager)
+    setup_usage_routes(app, usage_service)
+    
+    @app.on_event("startup")
+    async def start_usage_service():
+        await usage_service.start()
+        
+    @app.on_event("shutdown")
+    async def stop_usage_service():
+        await usage_service.stop()
+    
+    # 后台完整性校验服务（除非指定了 --no-integrity）
+    integrity_service = IntegrityService(manager)
+    setup_integrity_routes(app, integrity_service)
+    if not args.no_integrity:
+        @app.on_event("startup")
+        async def start_integrity_service():
+            await integrity_service.start()
+            
+        @app.on_event("shutdown")
+        async def stop_integrity_service():
+            await integrity_service.stop()
+    
     # 在新线程中打开浏览器（如果未指定--no-browser）
     if not args.no_browser and frontend_url:
         threading.Thread(target=open_browser, args=(frontend_url,), daemon=True).start()
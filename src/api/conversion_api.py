@@ -0,0 +1,54 @@
+from fastapi import APIRouter, FastAPI, HTTPException
+from pydantic import BaseModel
+
+
+class ConvertRequest(BaseModel):
+    path: str
+    target: str = "F16"
+    keep_backup: bool = True
+
+
+def create_conversion_api(conversion_service):
+    """创建模型精度转换路由
+
+    Args:
+        conversion_service: ConversionService实例
+
+    Returns:
+        APIRouter: FastAPI路由对象
+    """
+    router = APIRouter()
+
+    @router.post("/conversions")
+    async def create_conversion(request: ConvertRequest):
+        """提交fp32转fp16/bf16任务，校验通过后替换原文件"""
+        try:
+            return conversion_service.submit(request.path, request.target, request.keep_backup)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @router.get("/conversions")
+    async def list_conversions():
+        """列出转换任务"""
+        return conversion_service.list_jobs()
+
+    @router.get("/conversions/{job_id}")
+    async def get_conversion(job_id: str):
+        """获取转换任务状态"""
+        job = conversion_service.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return job
+
+    return router
+
+
+def setup_conversion_routes(app: FastAPI, conversion_service):
+    """将模型精度转换路由添加到FastAPI应用
+
+    Args:
+        app: FastAPI应用实例
+        conversion_service: ConversionService实例
+    """
+    conversion_router = create_conversion_api(conversion_service)
+    app.include_router(conversion_router, prefix="/api")
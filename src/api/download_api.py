@@ -0,0 +1,86 @@
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, HTTPException
+from pydantic import BaseModel
+
+from src.services.download_service import DownloadError
+
+
+class DownloadRequest(BaseModel):
+    source: str
+    folder: Optional[str] = None
+    sha256: Optional[str] = None
+    filename: Optional[str] = None
+
+
+def create_download_api(download_service):
+    """创建模型下载路由
+
+    Args:
+        download_service: DownloadService实例
+
+    Returns:
+        APIRouter: FastAPI路由对象
+    """
+    router = APIRouter()
+
+    @router.post("/downloads")
+    async def create_download(request: DownloadRequest):
+        """按Civitai模型版本ID、Civitai链接或直链下载模型"""
+        try:
+            return await download_service.submit(
+                request.source, request.folder, request.sha256, request.filename
+            )
+        except DownloadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"创建下载任务失败: {str(e)}")
+
+    @router.get("/downloads")
+    async def list_downloads():
+        """列出下载任务"""
+        return download_service.list_jobs()
+
+    @router.get("/downloads/{job_id}")
+    async def get_download(job_id: str):
+        """获取下载任务状态"""
+        job = download_service.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return job
+
+    @router.post("/downloads/{job_id}/pause")
+    async def pause_download(job_id: str):
+        """暂停下载，保留已下载的部分"""
+        job = await download_service.pause(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return job
+
+    @router.post("/downloads/{job_id}/resume")
+    async def resume_download(job_id: str):
+        """继续暂停、中断或失败的下载"""
+        job = download_service.resume(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return job
+
+    @router.delete("/downloads/{job_id}")
+    async def delete_download(job_id: str):
+        """取消下载并删除未完成的文件"""
+        if not await download_service.remove(job_id):
+            raise HTTPException(status_code=404, detail="任务不存在")
+        return {"success": True}
+
+    return router
+
+
+def setup_download_routes(app: FastAPI, download_service):
+    """将模型下载路由添加到FastAPI应用
+
+    Args:
+        app: FastAPI应用实例
+        download_service: DownloadService实例
+    """
+    download_router = create_download_api(download_service)
+    app.include_router(download_router, prefix="/api")
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from src.core.event_bus import event_bus
+from src.core.network_service import network_service
+from src.api.comfyui_api import is_port_open, COMFYUI_HOST, COMFYUI_PORT
+
+# 心跳间隔（秒），保持连接不被代理断开
+HEARTBEAT_INTERVAL = 15
+# ComfyUI状态检测间隔（秒）
+COMFYUI_CHECK_INTERVAL = 5
+
+
+class ComfyUIStatusWatcher:
+    """在有订阅者时由服务端统一检测ComfyUI状态，状态变化时推送事件
+
+    多个页面不再各自轮询 /api/comfyui-status。
+    """
+
+    def __init__(self):
+        self.status: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure_running(self):
+        """确保检测任务正在运行"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch_loop())
+
+    async def _watch_loop(self):
+        """检测循环，没有订阅者时自动退出"""
+        while event_bus.subscriber_count > 0:
+            try:
+                port_open = await is_port_open(COMFYUI_HOST, COMFYUI_PORT, timeout=0.5)
+                status = "running" if port_open else "stopped"
+                if status != self.status:
+                    self.status = status
+                    event_bus.publish("comfyui_status", {"status": status})
+            except Exception as e:
+                print(f"检测ComfyUI状态失败: {str(e)}")
+            await asyncio.sleep(COMFYUI_CHECK_INTERVAL)
+        self.status = None
+
+
+def format_sse(event: dict) -> str:
+    """将事件格式化为SSE消息"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def create_events_api(manager):
+    """创建实时事件推送路由
+
+    Args:
+        manager: ModelManager实例
+
+    Returns:
+        APIRouter: FastAPI路由对象
+    """
+    router = APIRouter()
+    comfyui_watcher = ComfyUIStatusWatcher()
+
+    @router.get("/events")
+    async def stream_events(request: Request):
+        """推送模型增删、NSFW切换、配置变化、备份状态、网络和ComfyUI状态"""
+        queue = event_bus.subscribe()
+        comfyui_watcher.ensure_running()
+
+        async def event_generator():
+            try:
+                # 首条消息提供当前状态，客户端据此决定是否需要增量同步
+                yield format_sse({
+                    "type": "hello",
+                    "data": {
+                        "instance_id": manager.instance_id,
+                        "seq": manager.library_version,
+                        "comfyui_status": comfyui_watcher.status,
+                        "network_status": network_service.network_status_cache,
+                    }
+                })
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                        yield format_sse(event)
+                    except asyncio.TimeoutError:
+                        if await request.is_disconnected():
+                            break
+                        yield ": heartbeat\n\n"
+            finally:
+                event_bus.unsubscribe(queue)
+
+        return StreamingResponse(
+            event_generator(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
+        )
+
+    return router
+
+
+def setup_event_routes(app: FastAPI, manager):
+    """将实时事件路由添加到FastAPI应用
+
+    Args:
+        app: FastAPI应用实例
+        manager: ModelManager实例
+    """
+    events_router = create_events_api(manager)
+    app.include_router(events_router, prefix="/api")
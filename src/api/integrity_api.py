@@ -0,0 +1,43 @@
+from fastapi import APIRouter, FastAPI, HTTPException
+from pydantic import BaseModel
+
+
+class VerifyRequest(BaseModel):
+    path: str
+
+
+def create_integrity_api(integrity_service):
+    """创建完整性校验路由
+
+    Args:
+        integrity_service: IntegrityService实例
+
+    Returns:
+        APIRouter: FastAPI路由对象
+    """
+    router = APIRouter()
+
+    @router.get("/integrity")
+    async def get_integrity_status():
+        """获取后台校验进度以及发现的损坏、截断或丢失的模型"""
+        return integrity_service.get_status()
+
+    @router.post("/integrity/verify")
+    async def verify_model(request: VerifyRequest):
+        """将指定模型加入优先校验队列"""
+        if not integrity_service.request_verification(request.path):
+            raise HTTPException(status_code=404, detail="模型不存在")
+        return {"success": True, "message": "已加入校验队列"}
+
+    return router
+
+
+def setup_integrity_routes(app: FastAPI, integrity_service):
+    """将完整性校验路由添加到FastAPI应用
+
+    Args:
+        app: FastAPI应用实例
+        integrity_service: IntegrityService实例
+    """
+    integrity_router = create_integrity_api(integrity_service)
+    app.include_router(integrity_router, prefix="/api")
@@ -1,9 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
 import os
+from src.utils.export_utils import iter_csv, iter_ndjson
 from src.utils.file_utils import select_directory
+from src.utils.http_cache import make_etag, content_etag, etag_json_response
 
 class PathUpdate(BaseModel):
     path: str
@@ -11,6 +16,29 @@ class PathUpdate(BaseModel):
 class ModelIdParam(BaseModel):
     model_id: str
 
+class HardlinkRequest(BaseModel):
+    hashes: Optional[List[str]] = None
+    dry_run: bool = False
+
+# CSV导出的列
+EXPORT_CSV_FIELDS = [
+    "path", "name", "type", "baseModel", "precision", "hash",
+    "nsfw", "custom_nsfw", "original_nsfw", "nsfwLevel", "url", "preview_url"
+]
+# 不压缩的流式响应路径：GZip会先攒够数据再输出，导出下载和扫描进度、事件推送都会被缓冲
+GZIP_EXCLUDED_PATHS = ("/api/models/export", "/api/prompt-library/export", "/api/scan", "/api/events")
+
+
+class StreamingSafeGZipMiddleware(GZipMiddleware):
+    """跳过流式响应路径的GZip中间件"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(GZIP_EXCLUDED_PATHS):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 def create_api(manager):
     """创建并配置FastAPI应用
     
@@ -26,12 +54,119 @@ def create_api(manager):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Library-Instance", "X-Library-Seq"],
     )
 
+    # 压缩超过阈值的响应，减少远程访问时的传输量
+    app.add_middleware(StreamingSafeGZipMiddleware, minimum_size=1024)
+
     @app.get("/api/models")
-    async def get_models():
-        """获取所有模型信息"""
-        return manager.get_all_models_info()
+    async def get_models(request: Request, root: Optional[List[str]] = Query(None), folder: Optional[str] = None):
+        """获取所有模型信息，支持基于模型库版本的条件GET
+
+        Args:
+            root: 可重复指定的根目录，用于切换或组合多个模型库，默认为当前模型目录
+            folder: 相对于根目录的子文件夹，如 loras/characters
+        """
+        # 取得一次快照，ETag、版本号和返回内容都来自同一版本
+        snapshot = manager.snapshot
+        etag = make_etag("models", snapshot.instance_id, snapshot.version)
+        # 返回当前版本号，客户端可据此调用 /api/models/changes 增量同步
+        headers = {
+            "X-Library-Instance": snapshot.instance_id,
+            "X-Library-Seq": str(snapshot.version),
+        }
+        return etag_json_response(
+            request, etag, lambda: manager.get_all_models_info(root, folder, snapshot), headers
+        )
+
+    @app.get("/api/models/folders")
+    async def get_model_folders(root: Optional[str] = None, folder: Optional[str] = None):
+        """获取文件夹的直接子文件夹及模型数量，用于按文件夹浏览"""
+        return {"folders": manager.get_folders(root, folder)}
+
+    @app.get("/api/models/facets")
+    async def get_model_facets():
+        """获取筛选侧边栏所需的分面计数"""
+        return manager.get_model_facets()
+
+    @app.get("/api/models/export")
+    async def export_models(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), full: bool = False):
+        """流式导出模型库，支持NDJSON和CSV格式
+
+        Args:
+            format: 导出格式，ndjson 或 csv
+            full: NDJSON格式下是否附带原始Civitai信息
+        """
+        records = manager.iter_models_info(include_info=full and format == "ndjson")
+        if format == "csv":
+            content = iter_csv(records, EXPORT_CSV_FIELDS)
+            media_type = "text/csv; charset=utf-8"
+            filename = "models.csv"
+        else:
+            content = iter_ndjson(records)
+            media_type = "application/x-ndjson"
+            filename = "models.ndjson"
+        return StreamingResponse(
+            content,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    @app.get("/api/models/duplicates")
+    async def get_duplicate_models():
+        """查找内容相同的重复模型文件，并统计可回收空间"""
+        return manager.find_duplicates()
+
+    @app.post("/api/models/duplicates/hardlink")
+    async def hardlink_duplicate_models(request: HardlinkRequest):
+        """将重复模型替换为硬链接以回收空间"""
+        try:
+            # 替换前逐字节比较文件内容，大模型耗时较长，在线程中执行以免阻塞事件循环
+            return await asyncio.to_thread(manager.hardlink_duplicates, request.hashes, request.dry_run)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"创建硬链接失败: {str(e)}")
+
+    @app.get("/api/models/similar")
+    async def get_similar_models(path: str, limit: int = Query(20, ge=1, le=200)):
+        """查找与指定模型结构或训练内容相似的模型（近似重复、同概念重训）"""
+        return manager.find_similar_models(path, limit)
+
+    @app.get("/api/models/{model_id:path}/tags")
+    async def get_model_tags(model_id: str):
+        """获取模型的触发词和训练标签（Civitai trainedWords 与 ss_tag_frequency 合并）"""
+        result = manager.get_model_tags(model_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="模型不存在")
+        return result
+
+    @app.get("/api/tags/models")
+    async def get_models_by_tag(tag: str = Query(..., min_length=1), limit: int = Query(100, ge=1, le=1000)):
+        """查找使用指定触发词或训练标签的模型
+
+        标签通过查询参数传递，其中可能包含 "/"（如 "artist/name"），不能放在路径中
+        """
+        return manager.find_models_by_tag(tag, limit)
+
+    @app.get("/api/stats/storage")
+    async def get_storage_stats(top: int = Query(20, ge=1, le=500)):
+        """获取按根目录、文件夹、类型、基础模型和精度汇总的磁盘占用"""
+        return manager.get_storage_stats(top)
+
+    @app.get("/api/stats/precision")
+    async def get_precision_report():
+        """列出含有fp32权重的模型及转换为16位后可节省的空间"""
+        return manager.get_precision_report()
+
+    @app.get("/api/models/changes")
+    async def get_model_changes(since: int = Query(0, ge=0), instance: str = ""):
+        """获取指定版本号之后的模型变更，reset为true时客户端需重新获取完整列表"""
+        return manager.get_changes_since(since, instance or None)
+
+    @app.get("/api/models/search")
+    async def search_models(q: str = "", limit: int = Query(50, ge=1, le=500)):
+        """按名称、文件名、标签、触发词和描述搜索模型"""
+        return manager.search_models(q, limit)
 
     @app.post("/api/path")
     async def update_path(path_update: PathUpdate):
@@ -55,18 +190,20 @@ def create_api(manager):
             raise HTTPException(status_code=500, detail=str(e))
 
     @app.get("/api/config")
-    async def get_config():
+    async def get_config(request: Request):
         """获取当前配置"""
-        return {
+        content = {
             "models_path": str(manager.models_path) if manager.models_path else "",
             "is_path_valid": os.path.exists(manager.models_path) if manager.models_path else False
         }
+        return etag_json_response(request, content_etag(content), lambda: content)
 
     @app.get("/api/model-path")
-    async def get_model_path():
+    async def get_model_path(request: Request):
         """获取模型目录"""
         path = str(manager.models_path) if manager.models_path else ""
-        return {"path": path}
+        content = {"path": path}
+        return etag_json_response(request, content_etag(content), lambda: content)
 
     @app.post("/api/toggle-nsfw")
     async def toggle_model_nsfw(model_param: ModelIdParam):
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, FastAPI
+
+
+def create_model_update_api(update_service):
+    """创建模型更新检查路由
+
+    Args:
+        update_service: ModelUpdateService实例
+
+    Returns:
+        APIRouter: FastAPI路由对象
+    """
+    router = APIRouter()
+
+    @router.get("/models/updates")
+    async def get_model_updates():
+        """获取在Civitai上有新版本的已安装模型"""
+        return update_service.get_status()
+
+    @router.post("/models/updates/check")
+    async def check_model_updates():
+        """立即重新检查全部已安装模型的更新"""
+        update_service.request_check()
+        return {"success": True, "message": "已开始检查更新"}
+
+    return router
+
+
+def setup_model_update_routes(app: FastAPI, update_service):
+    """将模型更新检查路由添加到FastAPI应用
+
+    Args:
+        app: FastAPI应用实例
+        update_service: ModelUpdateService实例
+    """
+    update_router = create_model_update_api(update_service)
+    app.include_router(update_router, prefix="/api")
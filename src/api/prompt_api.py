@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class TranslateRequest(BaseModel):
     text: str
@@ -34,6 +34,39 @@ def create_prompt_api(prompt_manager):
                 content={"detail": f"翻译失败: {error_msg}"}
             )
     
+    @router.get("/translate/cache-stats")
+    async def get_translation_cache_stats():
+        """获取翻译缓存的命中率和条目数量"""
+        cache = prompt_manager.translation_cache
+        if cache is None:
+            return {"enabled": False}
+        try:
+            return {"enabled": True, **cache.get_stats()}
+        except Exception as e:
+            return JSONResponse(
+                status_code=500,
+                content={"detail": f"获取翻译缓存统计失败: {str(e)}"}
+            )
+    
+    @router.delete("/translate/cache")
+    async def clear_translation_cache(text: Optional[str] = None, to_english: bool = False):
+        """删除指定文本的缓存翻译，未指定文本时清空全部缓存"""
+        cache = prompt_manager.translation_cache
+        if cache is None:
+            return JSONResponse(
+                status_code=400,
+                content={"detail": "翻译缓存未启用"}
+            )
+        try:
+            if text is not None:
+                return {"deleted": 1 if cache.invalidate(text, to_english) else 0}
+            return {"deleted": cache.clear()}
+        except Exception as e:
+            return JSONResponse(
+                status_code=500,
+                content={"detail": f"清除翻译缓存失败: {str(e)}"}
+            )
+    
     @router.post("/batch-translate")
     async def batch_translate(texts: List[str], to_english: bool = False):
         """批量翻译文本"""
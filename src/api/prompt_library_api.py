@@ -1,12 +1,29 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
 import uuid
 import os
+import io
 import json
 from datetime import datetime
 import sys
+import tempfile
+import threading
+
+from src.core.search_index import SearchIndex, cjk_bigrams, CJK_PATTERN
+from src.utils.export_utils import iter_csv, iter_json_array, iter_ndjson
+from src.utils.http_cache import make_etag, etag_json_response
+from src.utils.prompt_import import IMPORT_FORMATS, PromptImportError, iter_import_rows
+
+# 可选依赖：安装 pypinyin 后支持按拼音和拼音首字母搜索中文
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
 
 # 提示词库项目模型
 class PromptLibraryItem(BaseModel):
@@ -30,8 +47,36 @@ class UpdatePromptLibraryItemRequest(BaseModel):
     category: Optional[str] = None
     subCategory: Optional[str] = None
 
+# 按文本查找项目请求
+class LookupPromptLibraryRequest(BaseModel):
+    texts: List[str]
+
+# 修改后延迟保存的时间（秒），连续编辑只写一次文件
+SAVE_DELAY = 2.0
+# 搜索时各字段的权重
+ENGLISH_WEIGHT = 1.0
+CHINESE_WEIGHT = 1.0
+PINYIN_WEIGHT = 0.6
+CATEGORY_WEIGHT = 0.3
+# 查询与中文或英文完全相同时的额外得分
+EXACT_MATCH_BONUS = 1.0
+# 批量导入时每批写入的行数
+IMPORT_BATCH_SIZE = 1000
+# 导入请求体在内存中缓冲的上限，超出后写入临时文件
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024
+# CSV导出的列
+EXPORT_CSV_FIELDS = ["id", "chinese", "english", "category", "subCategory"]
+
 # 提示词库管理类
 class PromptLibraryManager:
+    """提示词库
+
+    项目按添加顺序保存在以ID为键的字典中，查找、更新和删除都不需要遍历；
+    另外维护 (中文, 英文) 到ID的索引用于去重、用于搜索的倒排索引（中文切分为二元组），
+    以及各分类和子分类的项目数量。
+    修改后延迟 SAVE_DELAY 秒批量写入文件，退出前调用 flush() 立即写入。
+    """
+
     def __init__(self, data_dir):
         self.data_dir = data_dir
         
@@ -43,102 +88,521 @@ class PromptLibraryManager:
             print(f"检测到打包环境，设置数据目录为: {self.data_dir}")
         
         self.library_file = os.path.join(self.data_dir, "prompt_library.json")
-        self.items = []
+        # 项目ID -> 项目，保持添加顺序
+        self.items: Dict[str, dict] = {}
+        # (中文, 英文) -> 项目ID
+        self._keys: Dict[Tuple[str, str], str] = {}
+        self.search_index = SearchIndex(exact_cjk=True)
+        # 小写的中文或英文全文 -> 项目ID集合，用于给完全匹配的结果加分
+        self._exact_index: Dict[str, set] = {}
+        self._exact_texts: Dict[str, Tuple[str, ...]] = {}
+        # 分类 -> {子分类: 项目数量}
+        self._category_counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        # 提示词库版本号，每次修改递增，用于生成ETag
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.version = 0
         self.load_library()
 
+    @staticmethod
+    def _key(item) -> Tuple[str, str]:
+        return item["chinese"], item["english"]
+
+    @staticmethod
+    def _pinyin_text(text: str) -> str:
+        """中文的全拼和拼音首字母，如 红色头发 -> hongsetoufa hstf"""
+        if lazy_pinyin is None:
+            return ""
+        words = []
+        for run in CJK_PATTERN.findall(text or ""):
+            words.append("".join(lazy_pinyin(run)))
+            words.append("".join(lazy_pinyin(run, style=Style.FIRST_LETTER)))
+        return " ".join(words)
+
+    def _count_item(self, item, delta: int):
+        """更新项目所在分类和子分类的计数"""
+        sub_counts = self._category_counts.setdefault(item["category"], {})
+        count = sub_counts.get(item["subCategory"], 0) + delta
+        if count > 0:
+            sub_counts[item["subCategory"]] = count
+        else:
+            sub_counts.pop(item["subCategory"], None)
+            if not sub_counts:
+                del self._category_counts[item["category"]]
+
+    def _index_item(self, item):
+        """更新项目的搜索索引"""
+        self._unindex_exact(item["id"])
+        texts = tuple({item.get("english", "").lower(), item.get("chinese", "").lower()})
+        self._exact_texts[item["id"]] = texts
+        for text in texts:
+            self._exact_index.setdefault(text, set()).add(item["id"])
+        self.search_index.update(item["id"], [
+            (item.get("english", ""), ENGLISH_WEIGHT),
+            (cjk_bigrams(item.get("chinese", ""), with_unigrams=True), CHINESE_WEIGHT),
+            (self._pinyin_text(item.get("chinese", "")), PINYIN_WEIGHT),
+            (cjk_bigrams(f"{item.get('category', '')} {item.get('subCategory', '')}", with_unigrams=True),
+             CATEGORY_WEIGHT),
+        ])
+
+    def _unindex_exact(self, item_id: str):
+        """从完全匹配索引中移除项目"""
+        for text in self._exact_texts.pop(item_id, ()):
+            ids = self._exact_index.get(text)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._exact_index[text]
+
     def load_library(self):
         """加载提示词库"""
+        items = []
         try:
             if os.path.exists(self.library_file):
                 with open(self.library_file, "r", encoding="utf-8") as f:
-                    self.items = json.load(f)
-                print(f"已加载提示词库，共{len(self.items)}个项目")
+                    items = json.load(f)
+                print(f"已加载提示词库，共{len(items)}个项目")
             else:
-                self.items = []
                 print(f"提示词库文件不存在，已初始化空库 (路径: {self.library_file})")
         except Exception as e:
             print(f"加载提示词库失败: {str(e)}")
-            self.items = []
+            items = []
+
+        with self._lock:
+            self.items = {}
+            self._keys = {}
+            self._category_counts = {}
+            self.search_index.clear()
+            self._exact_index = {}
+            self._exact_texts = {}
+            for item in items:
+                self.items[item["id"]] = item
+                self._keys.setdefault(self._key(item), item["id"])
+                self._index_item(item)
+                self._count_item(item, 1)
+            self.version += 1
 
     def save_library(self):
-        """保存提示词库"""
+        """保存提示词库（先写临时文件再替换，避免写入中断损坏文件）"""
         try:
             # 确保目录存在
             os.makedirs(self.data_dir, exist_ok=True)
             
-            with open(self.library_file, "w", encoding="utf-8") as f:
-                json.dump(self.items, f, ensure_ascii=False, indent=2)
-            print(f"已保存提示词库，共{len(self.items)}个项目")
+            with self._lock:
+                temp_file = self.library_file + ".tmp"
+                with open(temp_file, "w", encoding="utf-8") as f:
+                    json.dump(list(self.items.values()), f, ensure_ascii=False, indent=2)
+                os.replace(temp_file, self.library_file)
+                self._dirty = False
+                print(f"已保存提示词库，共{len(self.items)}个项目")
             return True
         except Exception as e:
             print(f"保存提示词库失败: {str(e)}")
             return False
 
+    def _schedule_save(self):
+        """标记已修改，SAVE_DELAY 秒后统一保存"""
+        self._dirty = True
+        self.version += 1
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """立即保存尚未写入文件的修改"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return True
+            return self.save_library()
+
     def get_all_items(self):
         """获取所有提示词库项目"""
-        return self.items
+        return list(self.items.values())
 
-    def add_item(self, item_data: CreatePromptLibraryItemRequest):
-        """添加提示词库项目"""
+    def get_item(self, item_id: str):
+        """按ID获取提示词库项目"""
+        return self.items.get(item_id)
+
+    def get_category_tree(self) -> dict:
+        """获取分类和子分类树及各自的项目数量，按名称排序"""
+        with self._lock:
+            categories = [
+                {
+                    "name": category,
+                    "count": sum(sub_counts.values()),
+                    "subCategories": [
+                        {"name": sub_category, "count": count}
+                        for sub_category, count in sorted(sub_counts.items())
+                    ],
+                }
+                for category, sub_counts in sorted(self._category_counts.items())
+            ]
+            return {"total": len(self.items), "categories": categories}
+
+    def search(self, query: str = "", category: Optional[str] = None, sub_category: Optional[str] = None,
+               offset: int = 0, limit: int = 20) -> dict:
+        """搜索提示词库
+
+        英文支持前缀和子串匹配，中文按二元组做子串匹配，安装 pypinyin 后还支持拼音和拼音首字母。
+        结果按相关度排序，得分相同时较短的提示词在前；没有查询词时按添加顺序列出。
+
+        Args:
+            query: 查询文本
+            category: 只返回指定分类的项目
+            sub_category: 只返回指定子分类的项目
+            offset: 跳过的结果数量
+            limit: 返回的结果数量
+        """
+        def matches_filter(item) -> bool:
+            return ((category is None or item["category"] == category)
+                    and (sub_category is None or item["subCategory"] == sub_category))
+
+        with self._lock:
+            if query.strip():
+                scores = self.search_index.scores(cjk_bigrams(query))
+                for item_id in self._exact_index.get(query.strip().lower(), ()):
+                    if item_id in scores:
+                        scores[item_id] += EXACT_MATCH_BONUS
+                if category is not None or sub_category is not None:
+                    scores = {
+                        item_id: score for item_id, score in scores.items()
+                        if matches_filter(self.items[item_id])
+                    }
+                total = len(scores)
+                # 只选出当前页及之前的结果，不对全部匹配项排序
+                items = self.items
+                top = heapq.nsmallest(
+                    offset + limit, scores.items(),
+                    key=lambda result: (-result[1], len(items[result[0]]["english"]))
+                )[offset:]
+                page = [(items[item_id], score) for item_id, score in top]
+            else:
+                if category is None:
+                    total = len(self.items)
+                else:
+                    sub_counts = self._category_counts.get(category, {})
+                    total = sum(sub_counts.values()) if sub_category is None else sub_counts.get(sub_category, 0)
+                items = (item for item in self.items.values() if matches_filter(item))
+                page = [(item, None) for item in itertools.islice(items, offset, offset + limit)]
+
+        return {
+            "query": query,
+            "total": total,
+            "offset": offset,
+            "items": [
+                {**item, "score": round(score, 3)} if score is not None else item
+                for item, score in page
+            ],
+        }
+
+    def lookup(self, texts: Iterable[str]) -> dict:
+        """按中文或英文完全匹配（不区分大小写）查找项目，用于识别已在库中的提示词
+
+        Returns:
+            dict: 文本 -> 项目，库中没有的文本不包含在内
+        """
+        result = {}
+        with self._lock:
+            for text in texts:
+                stripped = text.strip()
+                item_ids = self._exact_index.get(stripped.lower())
+                if not item_ids:
+                    continue
+                # 优先大小写完全一致的项目，其余按ID选出固定的一个
+                result[text] = min(
+                    (self.items[item_id] for item_id in item_ids),
+                    key=lambda item: (stripped not in (item["english"], item["chinese"]), item["id"])
+                )
+        return result
+
+    def _insert(self, chinese: str, english: str, category: str, sub_category: str):
+        """写入新项目并更新索引，已存在相同中英文时返回None（调用方负责加锁和保存）"""
+        key = (chinese, english)
+        if key in self._keys:
+            return None
         new_item = {
             "id": str(uuid.uuid4()),
-            "chinese": item_data.chinese,
-            "english": item_data.english,
-            "category": item_data.category,
-            "subCategory": item_data.subCategory
+            "chinese": chinese,
+            "english": english,
+            "category": category,
+            "subCategory": sub_category
         }
-        
-        # 检查是否已存在相同的项目
-        if any(item["chinese"] == item_data.chinese and item["english"] == item_data.english for item in self.items):
-            return None
-            
-        self.items.append(new_item)
-        self.save_library()
+        self.items[new_item["id"]] = new_item
+        self._keys[key] = new_item["id"]
+        self._index_item(new_item)
+        self._count_item(new_item, 1)
+        return new_item
+
+    def add_item(self, item_data: CreatePromptLibraryItemRequest):
+        """添加提示词库项目"""
+        with self._lock:
+            # 检查是否已存在相同的项目
+            new_item = self._insert(item_data.chinese, item_data.english,
+                                    item_data.category, item_data.subCategory)
+            if new_item is None:
+                return None
+            self._schedule_save()
         return new_item
 
+    def import_items(self, rows: Iterable[Optional[dict]], default_category: str = "",
+                     default_sub_category: str = "") -> dict:
+        """批量导入项目，与已有项目和本次导入的项目去重，全部完成后只保存一次
+
+        每 IMPORT_BATCH_SIZE 行释放一次锁，导入期间其他请求仍可读写。
+
+        Args:
+            rows: 项目字典，无效的行为None
+            default_category: 行中没有分类时使用的分类
+            default_sub_category: 行中没有子分类时使用的子分类
+
+        Returns:
+            dict: added（新增数量）、duplicates（重复数量）和 invalid（无效行数）
+
+        Raises:
+            读取 rows 时的异常原样抛出，出错前读到的行仍会导入，
+            已完成的数量保存在异常的 import_result 属性中
+        """
+        result = {"added": 0, "duplicates": 0, "invalid": 0}
+        batch = []
+
+        def commit():
+            with self._lock:
+                for row in batch:
+                    new_item = self._insert(
+                        row["chinese"], row["english"],
+                        row["category"] or default_category,
+                        row["subCategory"] or default_sub_category,
+                    )
+                    result["added" if new_item else "duplicates"] += 1
+                self.version += 1
+            batch.clear()
+
+        try:
+            for row in rows:
+                if row is None:
+                    result["invalid"] += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    commit()
+            commit()
+        except Exception as e:
+            # 出错前已读到的行同样导入，并把已完成的数量告诉调用方
+            commit()
+            e.import_result = dict(result)
+            raise
+        finally:
+            # 格式错误中断时，已导入的部分同样保存
+            if result["added"]:
+                with self._lock:
+                    self._dirty = True
+                    self.flush()
+        print(f"提示词库导入完成: 新增{result['added']}个，重复{result['duplicates']}个，无效{result['invalid']}行")
+        return result
+
+    def iter_items(self, category: Optional[str] = None):
+        """逐个返回项目，供流式导出使用
+
+        只预先复制ID列表，项目在遍历到时再读取，导出期间的修改不会打断遍历。
+        """
+        with self._lock:
+            item_ids = list(self.items)
+        for item_id in item_ids:
+            item = self.items.get(item_id)
+            if item is not None and (category is None or item["category"] == category):
+                yield item
+
     def update_item(self, item_id: str, item_data: UpdatePromptLibraryItemRequest):
-        """更新提示词库项目"""
-        for item in self.items:
-            if item["id"] == item_id:
-                if item_data.chinese is not None:
-                    item["chinese"] = item_data.chinese
-                if item_data.english is not None:
-                    item["english"] = item_data.english
-                if item_data.category is not None:
-                    item["category"] = item_data.category
-                if item_data.subCategory is not None:
-                    item["subCategory"] = item_data.subCategory
-                
-                self.save_library()
-                return item
-        return None
+        """更新提示词库项目
+
+        Raises:
+            ValueError: 修改后的中英文与其他项目重复
+        """
+        with self._lock:
+            item = self.items.get(item_id)
+            if item is None:
+                return None
+
+            old_key = self._key(item)
+            new_key = (
+                item_data.chinese if item_data.chinese is not None else item["chinese"],
+                item_data.english if item_data.english is not None else item["english"],
+            )
+            if new_key != old_key and self._keys.get(new_key, item_id) != item_id:
+                raise ValueError("提示词已存在")
+
+            self._count_item(item, -1)
+            if item_data.chinese is not None:
+                item["chinese"] = item_data.chinese
+            if item_data.english is not None:
+                item["english"] = item_data.english
+            if item_data.category is not None:
+                item["category"] = item_data.category
+            if item_data.subCategory is not None:
+                item["subCategory"] = item_data.subCategory
+
+            if new_key != old_key:
+                if self._keys.get(old_key) == item_id:
+                    del self._keys[old_key]
+                self._keys[new_key] = item_id
+            self._count_item(item, 1)
+            self._index_item(item)
+            self._schedule_save()
+            return item
 
     def delete_item(self, item_id: str):
         """删除提示词库项目"""
-        for i, item in enumerate(self.items):
-            if item["id"] == item_id:
-                del self.items[i]
-                self.save_library()
-                return True
-        return False
+        with self._lock:
+            item = self.items.pop(item_id, None)
+            if item is None:
+                return False
+            if self._keys.get(self._key(item)) == item_id:
+                del self._keys[self._key(item)]
+            self.search_index.remove(item_id)
+            self._unindex_exact(item_id)
+            self._count_item(item, -1)
+            self._schedule_save()
+            return True
 
 # 创建提示词库API
 def create_prompt_library_api(data_dir):
     router = APIRouter()
     library_manager = PromptLibraryManager(data_dir)
     
+    @router.on_event("shutdown")
+    async def flush_prompt_library():
+        """退出前写入尚未保存的修改"""
+        library_manager.flush()
+    
     @router.get("/prompt-library")
-    async def get_prompt_library():
-        """获取提示词库列表"""
+    async def get_prompt_library(request: Request):
+        """获取提示词库列表，支持基于版本号的条件GET"""
         try:
-            items = library_manager.get_all_items()
-            return {"items": items}
+            etag = make_etag("prompt-library", library_manager.instance_id, library_manager.version)
+            return etag_json_response(
+                request, etag, lambda: {"items": library_manager.get_all_items()}
+            )
         except Exception as e:
             return JSONResponse(
                 status_code=500,
                 content={"detail": f"获取提示词库失败: {str(e)}"}
             )
     
+    @router.get("/prompt-library/categories")
+    async def get_prompt_library_categories(request: Request):
+        """获取分类树及项目数量，用于侧边栏导航，支持条件GET"""
+        try:
+            etag = make_etag("prompt-library-categories", library_manager.instance_id, library_manager.version)
+            return etag_json_response(request, etag, library_manager.get_category_tree)
+        except Exception as e:
+            return JSONResponse(
+                status_code=500,
+                content={"detail": f"获取提示词分类失败: {str(e)}"}
+            )
+    
+    @router.get("/prompt-library/search")
+    async def search_prompt_library(
+        q: str = "",
+        category: Optional[str] = None,
+        subCategory: Optional[str] = None,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(20, ge=1, le=200),
+    ):
+        """搜索提示词库，支持分类筛选和分页"""
+        try:
+            return library_manager.search(q, category, subCategory, offset, limit)
+        except Exception as e:
+            return JSONResponse(
+                status_code=500,
+                content={"detail": f"搜索提示词库失败: {str(e)}"}
+            )
+    
+    @router.post("/prompt-library/lookup")
+    async def lookup_prompt_library(request: LookupPromptLibraryRequest):
+        """按中文或英文完全匹配查找多个提示词，返回文本到项目的映射"""
+        try:
+            return {"items": library_manager.lookup(request.texts)}
+        except Exception as e:
+            return JSONResponse(
+                status_code=500,
+                content={"detail": f"查找提示词失败: {str(e)}"}
+            )
+    
+    @router.post("/prompt-library/import")
+    async def import_prompt_library(
+        request: Request,
+        format: str = Query("csv", pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+        category: str = "",
+        subCategory: str = "",
+    ):
+        """批量导入提示词，请求体为文件原始内容
+
+        Args:
+            format: 文件格式，csv（带表头）、json（数组）、ndjson 或 danbooru（标签补全插件的标签表）
+            category: 行中没有分类时使用的分类
+            subCategory: 行中没有子分类时使用的子分类
+        """
+        # 请求体边接收边写入缓冲文件，超过 IMPORT_SPOOL_SIZE 后落盘，不在内存中保留整个文件
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as body:
+            async for chunk in request.stream():
+                body.write(chunk)
+            body.seek(0)
+
+            def run_import():
+                f = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+                try:
+                    return library_manager.import_items(
+                        iter_import_rows(f, format), category or "未分类", subCategory
+                    )
+                finally:
+                    # 缓冲文件由外层负责关闭
+                    f.detach()
+
+            try:
+                return await asyncio.to_thread(run_import)
+            except (PromptImportError, UnicodeDecodeError) as e:
+                # 出错前的行已经导入，一并返回已完成的数量
+                return JSONResponse(
+                    status_code=400,
+                    content={
+                        "detail": f"导入提示词失败: {str(e)}",
+                        **getattr(e, "import_result", {}),
+                    }
+                )
+            except Exception as e:
+                return JSONResponse(
+                    status_code=500,
+                    content={"detail": f"导入提示词失败: {str(e)}"}
+                )
+    
+    @router.get("/prompt-library/export")
+    async def export_prompt_library(
+        format: str = Query("json", pattern="^(json|ndjson|csv)$"),
+        category: Optional[str] = None,
+    ):
+        """流式导出提示词库，JSON格式与 prompt_library.json 相同，可直接重新导入"""
+        items = library_manager.iter_items(category)
+        if format == "csv":
+            content = iter_csv(items, EXPORT_CSV_FIELDS)
+            media_type = "text/csv; charset=utf-8"
+        elif format == "ndjson":
+            content = iter_ndjson(items)
+            media_type = "application/x-ndjson"
+        else:
+            content = iter_json_array(items)
+            media_type = "application/json"
+        return StreamingResponse(
+            content,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="prompt_library.{format}"'}
+        )
+    
     @router.post("/prompt-library")
     async def save_prompt_to_library(item: CreatePromptLibraryItemRequest):
         """保存提示词到库"""
@@ -168,7 +632,13 @@ def create_prompt_library_api(data_dir):
     async def update_prompt_library_item(item_id: str, item: UpdatePromptLibraryItemRequest):
         """更新提示词库项目"""
         try:
-            updated_item = library_manager.update_item(item_id, item)
+            try:
+                updated_item = library_manager.update_item(item_id, item)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={"detail": str(e)}
+                )
             if updated_item:
                 return updated_item
             else:
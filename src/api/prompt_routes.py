@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 import os
+import sys
 from src.api.prompt_api import create_prompt_api
 from src.api.prompt_library_api import create_prompt_library_api
 from src.core.prompt_manager import PromptManager
@@ -12,14 +13,18 @@ def setup_prompt_routes(app: FastAPI):
     Args:
         app: FastAPI应用实例
     """
-    # 创建提示词管理器实例
-    prompt_manager = PromptManager()
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
+    # 在打包环境中，使用应用程序所在目录下的data目录
+    if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+        data_dir = os.path.join(os.path.dirname(sys.executable), "data")
+    
+    # 创建提示词管理器实例（翻译缓存保存在数据目录）
+    prompt_manager = PromptManager(data_dir=data_dir)
     
     # 集成提示词管理API
     prompt_router = create_prompt_api(prompt_manager)
     app.include_router(prompt_router, prefix="/api")
 
     # 集成提示词库API
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
     prompt_library_router = create_prompt_library_api(data_dir)
     app.include_router(prompt_library_router, prefix="/api") 
\ No newline at end of file
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, Query
+
+
+def create_usage_api(usage_service):
+    """创建模型使用统计路由
+
+    Args:
+        usage_service: UsageService实例
+
+    Returns:
+        APIRouter: FastAPI路由对象
+    """
+    router = APIRouter()
+
+    @router.get("/usage")
+    async def get_model_usage(
+        sort: str = Query("last_used", pattern="^(last_used|use_count|size)$"),
+        unused_days: Optional[int] = Query(None, ge=0)
+    ):
+        """获取每个模型的使用次数和最后使用时间，unused_days 用于找出长期未使用的模型"""
+        return usage_service.get_usage(sort, unused_days)
+
+    @router.post("/usage/index")
+    async def index_model_usage():
+        """立即扫描输出目录，更新使用统计"""
+        usage_service.request_index()
+        return {"success": True, "message": "已开始更新使用统计"}
+
+    return router
+
+
+def setup_usage_routes(app: FastAPI, usage_service):
+    """将模型使用统计路由添加到FastAPI应用
+
+    Args:
+        app: FastAPI应用实例
+        usage_service: UsageService实例
+    """
+    usage_router = create_usage_api(usage_service)
+    app.include_router(usage_router, prefix="/api")
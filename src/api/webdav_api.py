@@ -6,8 +6,19 @@ import logging
 
 router = APIRouter(prefix="/api/webdav", tags=["webdav"])
 
-# 创建WebDAV服务实例
-webdav_service = WebDAVService()
+# WebDAV服务实例，由 init_webdav_api 按配置文件创建
+_webdav_service: Optional[WebDAVService] = None
+
+def init_webdav_api(config_file="config.json"):
+    """使用指定的配置文件创建WebDAV服务"""
+    global _webdav_service
+    _webdav_service = WebDAVService(config_file)
+
+def get_webdav_service() -> WebDAVService:
+    """获取WebDAV服务实例，未初始化时使用默认配置文件"""
+    if _webdav_service is None:
+        init_webdav_api()
+    return _webdav_service
 
 class WebDAVConfig(BaseModel):
     url: str
@@ -18,7 +29,7 @@ class BackupRequest(BaseModel):
     filename: Optional[str] = None
 
 @router.post("/setup")
-async def setup_webdav(config: WebDAVConfig):
+async def setup_webdav(config: WebDAVConfig, webdav_service: WebDAVService = Depends(get_webdav_service)):
     """设置WebDAV连接信息"""
     result = webdav_service.setup_webdav(config.url, config.username, config.password)
     if result:
@@ -27,12 +38,12 @@ async def setup_webdav(config: WebDAVConfig):
         raise HTTPException(status_code=400, detail="WebDAV连接测试失败")
 
 @router.get("/status")
-async def get_status():
+async def get_status(webdav_service: WebDAVService = Depends(get_webdav_service)):
     """获取WebDAV状态信息"""
     return webdav_service.get_backup_status()
 
 @router.post("/backup")
-async def backup_data():
+async def backup_data(webdav_service: WebDAVService = Depends(get_webdav_service)):
     """备份数据到WebDAV"""
     result = await webdav_service.backup_data()
     if result["success"]:
@@ -41,7 +52,7 @@ async def backup_data():
         raise HTTPException(status_code=400, detail=result["message"])
 
 @router.get("/list")
-async def list_backups():
+async def list_backups(webdav_service: WebDAVService = Depends(get_webdav_service)):
     """获取备份列表"""
     try:
         backups = await webdav_service.list_backups()
@@ -52,7 +63,7 @@ async def list_backups():
         raise HTTPException(status_code=500, detail=f"获取备份列表失败: {str(e)}")
 
 @router.post("/restore")
-async def restore_backup(backup: BackupRequest):
+async def restore_backup(backup: BackupRequest, webdav_service: WebDAVService = Depends(get_webdav_service)):
     """从备份恢复数据"""
     if not backup.filename:
         raise HTTPException(status_code=400, detail="未指定备份文件名")
@@ -64,7 +75,7 @@ async def restore_backup(backup: BackupRequest):
         raise HTTPException(status_code=400, detail=result["message"])
 
 @router.delete("/delete")
-async def delete_backup(filename: str = Query(..., description="要删除的备份文件名")):
+async def delete_backup(filename: str = Query(..., description="要删除的备份文件名"), webdav_service: WebDAVService = Depends(get_webdav_service)):
     """删除备份文件"""
     result = await webdav_service.delete_backup(filename)
     if result["success"]:
@@ -73,7 +84,7 @@ async def delete_backup(filename: str = Query(..., description="要删除的备
         raise HTTPException(status_code=400, detail=result["message"])
 
 @router.post("/test")
-async def test_connection(config: Optional[WebDAVConfig] = None):
+async def test_connection(config: Optional[WebDAVConfig] = None, webdav_service: WebDAVService = Depends(get_webdav_service)):
     """测试WebDAV连接"""
     if config:
         # 如果提供了新的配置，先尝试使用新配置测试
@@ -1,19 +1,60 @@
+import asyncio
 import json
 import os
+import threading
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
+
+from src.core.event_bus import event_bus
+
+# 配置文件路径 -> 共享的配置管理器
+_managers: Dict[str, "ConfigManager"] = {}
+_managers_lock = threading.Lock()
+# 键名中包含这些词或以 _key 结尾的配置项视为敏感信息（如 webdav_password、civitai_api_key），不对外推送
+SECRET_KEY_MARKERS = ("password", "token", "secret")
+
+
+def is_secret_key(key: str) -> bool:
+    """配置项是否为密码、API密钥等敏感信息"""
+    key = key.lower()
+    return key == "key" or key.endswith("_key") or any(marker in key for marker in SECRET_KEY_MARKERS)
+
+
+def get_config_manager(config_file="config.json") -> "ConfigManager":
+    """获取配置文件对应的共享配置管理器，同一文件在进程内只加载一次"""
+    key = os.path.abspath(config_file)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConfigManager(config_file)
+            _managers[key] = manager
+        return manager
+
 
 class ConfigManager:
+    """配置管理器
+
+    配置保存在内存中，读取不访问磁盘；写入时加锁并通过临时文件原子替换，
+    保存后通知订阅者。请通过 get_config_manager 获取共享实例。
+    """
+
     def __init__(self, config_file="config.json"):
         self.config_file = config_file
-        self.config = self.load_config()
+        self._lock = threading.RLock()
+        self._subscribers: List[Callable[[Dict[str, Any], set], None]] = []
+        self._mtime: Optional[float] = None
+        # 配置字典在整个生命周期内保持同一个对象，持有引用的读取方总能看到最新配置
+        self.config: Dict[str, Any] = {}
+        self.config.update(self.load_config())
         
     def load_config(self) -> Dict[str, Any]:
         """加载配置文件，如果不存在则创建默认配置"""
         try:
             if os.path.exists(self.config_file):
                 with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    config = json.load(f)
+                self._mtime = os.path.getmtime(self.config_file)
+                return config
             else:
                 # 创建默认配置
                 default_config = self.get_default_settings()
@@ -41,15 +82,92 @@ class ConfigManager:
         }
             
     def save_config(self, config: Dict[str, Any]) -> bool:
-        """保存配置到文件"""
+        """保存配置到文件（先写临时文件再原子替换，写入过程中崩溃不会损坏配置）"""
+        with self._lock:
+            try:
+                tmp_file = f"{self.config_file}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, ensure_ascii=False, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.config_file)
+                self._mtime = os.path.getmtime(self.config_file)
+                changed = self._replace_config(config)
+            except Exception as e:
+                print(f"保存配置文件时出错: {str(e)}")
+                return False
+        self._notify(changed)
+        return True
+
+    def _replace_config(self, config: Dict[str, Any]) -> set:
+        """原地替换内存中的配置，返回发生变化的键"""
+        changed = {
+            key for key in set(self.config) | set(config)
+            if self.config.get(key) != config.get(key)
+        }
+        if config is not self.config:
+            snapshot = dict(config)
+            self.config.clear()
+            self.config.update(snapshot)
+        return changed
+
+    def subscribe(self, callback: Callable[[Dict[str, Any], set], None]):
+        """订阅配置变化，回调参数为当前配置和发生变化的键"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any], set], None]):
+        """取消订阅配置变化"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self, changed: set):
+        """通知订阅者并推送配置变化
+
+        事件流允许任意来源访问，只推送发生变化的非敏感配置项，不包含密码和API密钥等字段。
+        """
+        for callback in list(self._subscribers):
+            try:
+                callback(self.config, changed)
+            except Exception as e:
+                print(f"配置变化回调出错: {str(e)}")
+        public_changes = {
+            key: self.config.get(key) for key in changed if not is_secret_key(key)
+        }
+        if public_changes:
+            event_bus.publish("config_changed", public_changes)
+
+    def reload_if_changed(self) -> bool:
+        """配置文件被外部修改时重新加载
+
+        Returns:
+            bool: 是否重新加载了配置
+        """
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
-            self.config = config
-            return True
-        except Exception as e:
-            print(f"保存配置文件时出错: {str(e)}")
+            mtime = os.path.getmtime(self.config_file)
+        except OSError:
             return False
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            try:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                # 可能正被其他程序写入，下次再试
+                print(f"重新加载配置文件失败: {str(e)}")
+                return False
+            self._mtime = mtime
+            changed = self._replace_config(config)
+        if changed:
+            print(f"配置文件已被外部修改，已重新加载: {', '.join(sorted(changed))}")
+            self._notify(changed)
+        return bool(changed)
+
+    async def watch(self, interval: float = 5.0):
+        """定期检查配置文件是否被外部修改"""
+        while True:
+            self.reload_if_changed()
+            await asyncio.sleep(interval)
             
     def get_config(self) -> Dict[str, Any]:
         """获取当前配置"""
@@ -57,10 +175,8 @@ class ConfigManager:
         
     def update_config(self, updates: Dict[str, Any]) -> bool:
         """更新配置并保存"""
-        # 更新配置字典
-        self.config.update(updates)
-        # 保存到文件
-        return self.save_config(self.config)
+        with self._lock:
+            return self.save_config({**self.config, **updates})
         
     def get_model_path(self) -> str:
         """获取模型路径"""
@@ -68,8 +184,7 @@ class ConfigManager:
         
     def update_model_path(self, path: str) -> bool:
         """更新模型路径"""
-        self.config['model_path'] = path
-        return self.save_config(self.config)
+        return self.update_config({'model_path': path})
         
     def get_custom_nsfw_models(self) -> List[str]:
         """获取自定义NSFW模型列表"""
@@ -77,19 +192,19 @@ class ConfigManager:
         
     def update_custom_nsfw_models(self, models: List[str]) -> bool:
         """更新自定义NSFW模型列表"""
-        self.config['custom_nsfw_models'] = models
-        return self.save_config(self.config)
+        return self.update_config({'custom_nsfw_models': models})
         
     def toggle_model_nsfw(self, model_name: str) -> bool:
         """切换模型的NSFW状态"""
-        custom_nsfw_models = self.get_custom_nsfw_models()
-        
-        if model_name in custom_nsfw_models:
-            custom_nsfw_models.remove(model_name)
-        else:
-            custom_nsfw_models.append(model_name)
+        with self._lock:
+            custom_nsfw_models = list(self.get_custom_nsfw_models())
             
-        return self.update_custom_nsfw_models(custom_nsfw_models)
+            if model_name in custom_nsfw_models:
+                custom_nsfw_models.remove(model_name)
+            else:
+                custom_nsfw_models.append(model_name)
+                
+            return self.update_custom_nsfw_models(custom_nsfw_models)
         
     def get_webdav_config(self) -> Dict[str, Any]:
         """获取WebDAV配置"""
@@ -116,5 +231,4 @@ class ConfigManager:
         
     def update_last_backup_time(self, time_str: str) -> bool:
         """更新最后备份时间"""
-        self.config['last_backup'] = time_str
-        return self.save_config(self.config) 
\ No newline at end of file
+        return self.update_config({'last_backup': time_str}) 
\ No newline at end of file
@@ -0,0 +1,66 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set
+
+
+class EventBus:
+    """进程内事件总线，向所有订阅者（SSE连接）推送事件
+
+    发布方可以在事件循环线程或其他线程中调用 publish，
+    没有订阅者时发布几乎没有开销。
+    """
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """新增订阅者，需要在事件循环中调用"""
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """移除订阅者"""
+        self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, data: Any = None):
+        """发布事件
+
+        Args:
+            event_type: 事件类型，如 model_upsert、config_changed
+            data: 可JSON序列化的事件内容
+        """
+        if not self._subscribers or self._loop is None:
+            return
+        event = {"type": event_type, "time": time.time(), "data": data}
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self._dispatch(event)
+        elif not self._loop.is_closed():
+            # 来自其他线程的事件，转交给事件循环处理
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Dict[str, Any]):
+        """将事件放入每个订阅者的队列，队列已满时丢弃最旧的事件"""
+        for queue in list(self._subscribers):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+
+# 创建全局事件总线实例
+event_bus = EventBus()
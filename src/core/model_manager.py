@@ -2,21 +2,68 @@ import os
 import json
 import requests
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, List
+from collections import Counter, OrderedDict
 import aiohttp
 import aiofiles
 from urllib.parse import urlparse
 import time
+import math
+import heapq
+import uuid
 import asyncio
+import threading
+import shutil
+import filecmp
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
 from aiohttp import ClientTimeout
 
 from src.utils.hash_utils import HashUtils
-from src.core.config_manager import ConfigManager
+from src.core.config_manager import get_config_manager
+from src.core.search_index import SearchIndex, strip_html
+from src.core.path_index import PathTrie
+from src.core.similarity_index import SimilarityIndex
+from src.core.tag_index import TagIndex
+from src.utils.safetensors_utils import read_header_summary, SIGNATURE_BUCKETS
+from src.utils.sidecar_utils import merge_a1111_json, read_sidecar_metadata
+from src.core.event_bus import event_bus
+
+
+@dataclass(frozen=True)
+class LibrarySnapshot:
+    """模型库的不可变快照
+
+    读取方一次性取得当前快照后只访问快照内的数据，
+    写入方修改工作副本后整体发布新快照，读取无需加锁且不会看到修改到一半的数据。
+    """
+    version: int
+    instance_id: str
+    records: Mapping[str, dict]  # 模型路径 -> 显示记录
+    entries: Mapping[str, dict]  # 模型路径 -> 原始模型信息
+    path_index: PathTrie
+    facets: Mapping[str, Any]
+    storage: Mapping[str, Any]
+
 
 class ModelManager:
+    # 分面统计的维度
+    FACET_DIMENSIONS = ("type", "baseModel", "nsfw", "root", "precision")
+    # 磁盘占用统计的维度
+    STORAGE_DIMENSIONS = ("root", "folder", "type", "baseModel", "precision")
+    # 保留的磁盘占用历史记录条数
+    STORAGE_HISTORY_LIMIT = 365
+    # 可从文件名中识别的精度标记
+    PRECISION_TOKENS = ("fp32", "fp16", "bf16", "fp8")
+    # safetensors数据类型对应的精度名称
+    DTYPE_PRECISIONS = {"F32": "fp32", "F16": "fp16", "BF16": "bf16", "F8_E4M3": "fp8", "F8_E5M2": "fp8"}
+    # 扫描过程中发布快照的最短间隔（秒）
+    SNAPSHOT_INTERVAL = 0.5
+
     def __init__(self, config_file="config.json"):
         # 使用配置管理器
-        self.config_manager = ConfigManager(config_file)
+        self.config_manager = get_config_manager(config_file)
         models_path_str = self.config_manager.get_model_path()
         # 如果路径为空，则设置为 None
         self.models_path = Path(models_path_str) if models_path_str else None
@@ -32,16 +79,137 @@ class ModelManager:
         # 添加并发限制和超时设置
         self.semaphore = asyncio.Semaphore(5)  # 限制并发请求数
         self.timeout = ClientTimeout(total=10)  # 10秒超时
+        # 自定义NSFW集合与显示信息缓存，避免每次请求都重新计算
+        self._custom_nsfw = set(self.config_manager.get_custom_nsfw_models())
+        self._display_cache: Dict[str, dict] = {}
+        # 筛选侧边栏的分面计数，随模型增删改增量维护
+        self._facets: Dict[str, Counter] = {dim: Counter() for dim in self.FACET_DIMENSIONS}
+        self._facet_keys: Dict[str, tuple] = {}
+        # 磁盘占用汇总：维度 -> 取值 -> [模型数量, 字节数]
+        self._storage: Dict[str, Dict[str, list]] = {dim: {} for dim in self.STORAGE_DIMENSIONS}
+        self.storage_history_file = self.data_dir / "storage_history.json"
+        # 模型名称、文件名、标签、触发词和描述的全文索引
+        self.search_index = SearchIndex()
+        # 按根目录和文件夹层级索引模型路径
+        self.path_index = PathTrie()
+        # 哈希 -> 模型路径集合，用于查找重复文件
+        self._hash_index: Dict[str, set] = {}
+        self._model_hashes: Dict[str, str] = {}
+        # 基于头部结构签名和训练标签的相似度索引
+        self.similarity_index = SimilarityIndex(SIGNATURE_BUCKETS)
+        # 触发词与训练标签索引（正向和反向）
+        self.tag_index = TagIndex()
+        # Civitai模型ID -> 该模型的版本列表（由更新检查服务写入）
+        self._model_updates: Dict[str, dict] = {}
+        # 模型库版本号，任何影响显示结果的修改都会递增；实例ID用于区分进程重启
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.library_version = 0
+        # 增量同步的变更日志（按版本号有序）：模型路径 -> 最后一次变更的版本号
+        self._upsert_log: "OrderedDict[str, int]" = OrderedDict()
+        self._delete_log: "OrderedDict[str, int]" = OrderedDict()
+        # 早于该版本号的客户端需要重新获取完整列表
+        self._reset_version = 0
+        # 重建索引期间不逐条推送模型事件
+        self._rebuilding = False
+        # 写入锁保证同一时间只有一个写入方；读取方只访问已发布的快照
+        self._write_lock = threading.RLock()
+        self._snapshot_dirty = False
+        self._snapshot_time = 0.0
+        self._snapshot = self._build_snapshot()
+        # 扫描进行中时后台任务（如完整性校验）应让出磁盘带宽
+        self.scanning = False
+        # 配置被其他模块修改或从文件重新加载时同步
+        self.config_manager.subscribe(self._on_config_changed)
         
+    @property
+    def snapshot(self) -> LibrarySnapshot:
+        """获取当前已发布的模型库快照"""
+        return self._snapshot
+
+    def _build_snapshot(self) -> LibrarySnapshot:
+        """根据工作副本生成快照（需在写入锁内调用）"""
+        return LibrarySnapshot(
+            version=self.library_version,
+            instance_id=self.instance_id,
+            records=MappingProxyType(dict(self._display_cache)),
+            entries=MappingProxyType(dict(self.models_info)),
+            path_index=self.path_index.copy(),
+            facets=MappingProxyType({
+                "total": len(self._facet_keys),
+                **{dim: dict(counter) for dim, counter in self._facets.items()}
+            }),
+            storage=MappingProxyType({
+                dim: {value: {"count": count, "bytes": size} for value, (count, size) in values.items()}
+                for dim, values in self._storage.items()
+            }),
+        )
+
+    def _publish_snapshot(self, force: bool = True):
+        """发布新快照
+
+        Args:
+            force: 为False时若距上次发布不足 SNAPSHOT_INTERVAL 则跳过，用于扫描过程中合并多次修改
+        """
+        with self._write_lock:
+            if not self._snapshot_dirty:
+                return
+            if not force and time.time() - self._snapshot_time < self.SNAPSHOT_INTERVAL:
+                return
+            # 引用赋值是原子操作，读取方要么看到旧快照，要么看到完整的新快照
+            self._snapshot = self._build_snapshot()
+            self._snapshot_dirty = False
+            self._snapshot_time = time.time()
+
     def update_models_path(self, path: str):
         """更新模型路径"""
-        if path:
-            self.models_path = Path(path)
-        else:
-            self.models_path = None
+        self._apply_models_path(Path(path) if path else None)
         self.config_manager.update_model_path(path)
+
+    def _apply_models_path(self, models_path: Optional[Path]):
+        """切换当前模型目录"""
+        with self._write_lock:
+            self.models_path = models_path
+            # 可见模型范围变化，重建分面计数，客户端需重新获取完整列表
+            self._rebuild_facets()
+            self.library_version += 1
+            self._snapshot_dirty = True
+            self._reset_change_log()
+            self._publish_snapshot()
+
+    def _on_config_changed(self, config: dict, changed: set):
+        """配置变化（包括配置文件被外部修改）时同步模型路径和自定义NSFW列表"""
+        if "custom_nsfw_models" in changed:
+            self._sync_custom_nsfw(config.get("custom_nsfw_models", []))
+        if "model_path" in changed:
+            path = config.get("model_path")
+            models_path = Path(path) if path else None
+            if models_path != self.models_path:
+                self._apply_models_path(models_path)
+
+    def _sync_custom_nsfw(self, models: List[str]):
+        """使自定义NSFW集合与配置一致，只刷新状态变化的模型"""
+        with self._write_lock:
+            models = set(models)
+            affected = models ^ self._custom_nsfw
+            if not affected:
+                return
+            self._custom_nsfw = models
+            for model_path in affected:
+                if model_path in self.models_info:
+                    self._update_model_index(model_path)
+            self._publish_snapshot()
             
     async def scan_models(self):
+        """扫描模型，结束（包括客户端中途断开）时发布最终快照"""
+        self.scanning = True
+        try:
+            async for message in self._scan_models():
+                yield message
+        finally:
+            self.scanning = False
+            self._publish_snapshot()
+
+    async def _scan_models(self):
         """扫描指定目录下的所有.safetensors文件"""
         if not self.models_path:
             print("模型路径未设置")
@@ -74,22 +242,55 @@ class ModelManager:
         for file_path in safetensors_files:
             print(f"\n处理文件: {file_path.name}")
             try:
-                current_mtime = os.path.getmtime(file_path)
+                # 遍历时记录文件大小，用于磁盘占用统计
+                file_stat = os.stat(file_path)
+                current_mtime = file_stat.st_mtime
                 existing_info = self.models_info.get(str(file_path), {})
+                unchanged = bool(existing_info) and existing_info.get("info", {}).get("mtime") == current_mtime
+                # 上次未能完成Civitai查询（网络错误等）的文件需要重试，记录的哈希仍然可用
+                pending = unchanged and existing_info["info"].get("civitai_pending", False)
                 
                 # 检查文件是否已经扫描过且未修改
-                if existing_info and existing_info.get("info", {}).get("mtime") == current_mtime:
+                if unchanged and not pending:
                     print(f"文件 {file_path.name} 未修改，跳过扫描")
+                    # 补充旧版本扫描时没有记录的头部信息和文件大小
+                    if "header" not in existing_info:
+                        await self._attach_header_summary(file_path)
+                    if existing_info.get("size") != file_stat.st_size:
+                        self._update_entry(str(file_path), size=file_stat.st_size)
                     processed += 1
                     # 计算精确的进度：已处理的数量 / 总数量
                     progress = processed / total
                     yield f"data: {json.dumps({'progress': progress, 'message': f'跳过: {file_path.name}'})}\n\n"
                     continue
                 
-                model_hash = await self.hash_utils.calculate_model_hash_async(file_path)
-                print(f"计算得到哈希值: {model_hash}")
-                await self.fetch_model_info(model_hash, file_path, current_mtime)
+                loop = asyncio.get_event_loop()
+                sidecar = await loop.run_in_executor(self.hash_utils.thread_pool, read_sidecar_metadata, file_path)
+                if pending and existing_info.get("hash"):
+                    model_hash = existing_info["hash"]
+                else:
+                    model_hash = await self.hash_utils.calculate_model_hash_async(file_path)
+                    print(f"计算得到哈希值: {model_hash}")
+                # 附属文件记录的哈希与文件不一致时（文件已被替换为其他版本），附属文件已过期
+                stale = bool(sidecar and sidecar["hash"] and sidecar["hash"] != model_hash)
+                if stale:
+                    print(f"附属元数据与文件不匹配，忽略: {file_path.name}")
+                if sidecar and sidecar["info"] is not None and not stale:
+                    # 有 .civitai.info 或 .cm-info.json 时直接使用，跳过Civitai请求
+                    await self._import_sidecar(file_path, sidecar, model_hash, current_mtime)
+                else:
+                    # 先记录基础信息，Civitai查不到的模型（本地训练、私有或网络错误）也计入统计
+                    self._ensure_base_entry(file_path, model_hash, file_stat)
+                    local_preview = (
+                        await self._import_preview(sidecar["preview"], model_hash)
+                        if sidecar and not stale else None
+                    )
+                    user_metadata = sidecar["user_metadata"] if sidecar else None
+                    await self.fetch_model_info(model_hash, file_path, current_mtime, local_preview, user_metadata)
+                await self._attach_header_summary(file_path)
+                self._update_entry(str(file_path), size=file_stat.st_size)
                 self.save_models_info()  # 每次获取新信息后保存
+                self._publish_snapshot(force=False)  # 合并短时间内的多次修改后发布
                 processed += 1
                 # 计算精确的进度：已处理的数量 / 总数量
                 progress = processed / total
@@ -101,12 +302,106 @@ class ModelManager:
                 progress = processed / total
                 yield f"data: {json.dumps({'progress': progress, 'message': f'错误: {file_path.name}'})}\n\n"
         
+        # 发布最终结果并记录本次扫描后的磁盘占用
+        self._publish_snapshot()
+        self._record_storage_history()
+        
         # 确保最后一个消息是完成状态，但不需要额外的100%消息了
         if processed == total:
             yield f"data: {json.dumps({'progress': 1, 'message': '扫描完成', 'status': 'completed'})}\n\n"
     
-    async def fetch_model_info(self, model_hash, file_path, mtime: float):
-        """从Civitai API获取模型信息并下载预览图"""
+    async def _import_sidecar(self, file_path: Path, sidecar: dict, model_hash: str, mtime: float):
+        """使用附属元数据文件（.civitai.info、.cm-info.json，以及合并的 .json）作为模型信息，不访问网络
+
+        Args:
+            model_hash: 根据文件内容计算的哈希，不使用附属文件中记录的哈希
+        """
+        model_info = {
+            **sidecar["info"],
+            "metadata_source": sidecar["sources"],
+            "mtime": mtime,  # 记录文件修改时间
+            "scan_time": time.time()  # 记录扫描时间
+        }
+        local_preview = await self._import_preview(sidecar["preview"], model_hash)
+        if local_preview:
+            model_info["local_preview"] = local_preview
+        
+        with self._write_lock:
+            self.models_info[str(file_path)] = {
+                "hash": model_hash,
+                "info": model_info
+            }
+            self._update_model_index(str(file_path))
+        print(f"已从附属文件导入模型信息: {file_path.name} ({', '.join(sidecar['sources'])})")
+
+    async def register_model_file(self, file_path: Path, model_hash: str, model_info: Optional[dict] = None):
+        """登记哈希已知的新模型文件（如下载完成的模型），不再重新计算哈希
+
+        Args:
+            model_info: 已获取的Civitai模型版本信息，未提供时按哈希查询
+        """
+        stat = os.stat(file_path)
+        # 没有查到Civitai信息时也记录哈希和修改时间，避免下次扫描重新计算
+        self._ensure_base_entry(file_path, model_hash, stat)
+        if model_info is None:
+            await self.fetch_model_info(model_hash, file_path, stat.st_mtime)
+        else:
+            preview_url = (model_info.get("images") or [{}])[0].get("url")
+            local_preview = await self.download_image(preview_url) if preview_url else None
+            model_info = {**model_info, "mtime": stat.st_mtime, "scan_time": time.time()}
+            if local_preview:
+                model_info["local_preview"] = local_preview
+            with self._write_lock:
+                entry = self.models_info.get(str(file_path), {})
+                self.models_info[str(file_path)] = {**entry, "hash": model_hash, "info": model_info}
+                self._update_model_index(str(file_path))
+        
+        await self._attach_header_summary(Path(file_path))
+        self._update_entry(str(file_path), size=stat.st_size)
+        self._publish_snapshot()
+        self.save_models_info()
+
+    async def _import_preview(self, preview_path: Optional[Path], model_hash: str) -> Optional[str]:
+        """将模型旁边的预览图复制到图片目录并返回本地路径"""
+        if preview_path is None:
+            return None
+        filename = f"{model_hash[:16]}{preview_path.suffix.lower()}"
+        local_path = self.images_path / filename
+        if not local_path.exists():
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(self.hash_utils.thread_pool, shutil.copyfile, preview_path, local_path)
+            except OSError as e:
+                print(f"复制预览图失败: {preview_path}, 错误: {str(e)}")
+                return None
+        return f"/static/images/{filename}"
+
+    def _ensure_base_entry(self, file_path: Path, model_hash: str, stat: os.stat_result):
+        """记录模型的哈希、大小和修改时间，Civitai信息获取成功后再补充
+
+        新记录带有 civitai_pending 标记，查询完成（成功或确认Civitai上没有该模型）后才清除，
+        网络错误等导致查询失败时下次扫描会重试。已有记录时只更新哈希和大小，保留原有的
+        Civitai信息；其中的修改时间不变，同样会在下次扫描时重试。
+        """
+        model_path = str(file_path)
+        with self._write_lock:
+            entry = self.models_info.get(model_path)
+            if entry is None:
+                entry = {
+                    "hash": model_hash,
+                    "info": {"mtime": stat.st_mtime, "scan_time": time.time(), "civitai_pending": True}
+                }
+            self.models_info[model_path] = {**entry, "hash": model_hash, "size": stat.st_size}
+            self._update_model_index(model_path)
+
+    async def fetch_model_info(self, model_hash, file_path, mtime: float, local_preview: Optional[str] = None,
+                               user_metadata: Optional[dict] = None):
+        """从Civitai API获取模型信息并下载预览图
+
+        Args:
+            local_preview: 已有的本地预览图，提供时不再下载预览图
+            user_metadata: A1111的用户元数据（model.json），合并到获取的信息中
+        """
         async with self.semaphore:  # 使用信号量限制并发
             try:
                 async with aiohttp.ClientSession(timeout=self.timeout) as session:
@@ -116,21 +411,37 @@ class ModelManager:
                             
                             # 下载预览图
                             preview_url = model_info.get("images", [{}])[0].get("url")
-                            if preview_url:
+                            if local_preview is None and preview_url:
                                 local_preview = await self.download_image(preview_url)
-                                if local_preview:
-                                    model_info = {
-                                        **model_info,
-                                        "local_preview": local_preview,
-                                        "mtime": mtime,  # 记录文件修改时间
-                                        "scan_time": time.time()  # 记录扫描时间
-                                    }
-                            
-                            self.models_info[str(file_path)] = {
-                                "hash": model_hash,
-                                "info": model_info
+                            model_info = {
+                                **model_info,
+                                "mtime": mtime,  # 记录文件修改时间
+                                "scan_time": time.time()  # 记录扫描时间
                             }
+                            if local_preview:
+                                model_info["local_preview"] = local_preview
+                            if user_metadata:
+                                model_info = merge_a1111_json(model_info, user_metadata)
+                            
+                            with self._write_lock:
+                                # 保留已记录的大小和头部摘要
+                                entry = self.models_info.get(str(file_path), {})
+                                self.models_info[str(file_path)] = {
+                                    **entry,
+                                    "hash": model_hash,
+                                    "info": model_info
+                                }
+                                self._update_model_index(str(file_path))
                             print(f"成功获取模型信息: {file_path.name}")
+                        elif response.status == 404:
+                            # Civitai上没有该模型（本地训练或私有模型），记为已查询，下次扫描不再重试
+                            with self._write_lock:
+                                info = dict(self.models_info.get(str(file_path), {}).get("info", {}))
+                                info.pop("civitai_pending", None)
+                                if user_metadata:
+                                    info = merge_a1111_json(info, user_metadata)
+                                self._update_entry(str(file_path), info={**info, "mtime": mtime, "scan_time": time.time()})
+                            print(f"Civitai上没有该模型: {file_path.name}")
                         else:
                             print(f"无法获取模型信息: {file_path.name}, 状态码: {response.status}")
             except Exception as e:
@@ -158,6 +469,606 @@ class ModelManager:
         except Exception as e:
             print(f"加载模型信息失败: {str(e)}")
             self.models_info = {}
+        self._rebuild_model_index()
+
+    def _rebuild_model_index(self):
+        """根据当前模型信息重建全部显示缓存并发布快照"""
+        with self._write_lock:
+            self._display_cache = {}
+            self.search_index.clear()
+            self.path_index.clear()
+            self._hash_index = {}
+            self._model_hashes = {}
+            self.similarity_index.clear()
+            self.tag_index.clear()
+            self.library_version += 1
+            self._rebuilding = True
+            try:
+                for model_path in self.models_info.keys():
+                    self._update_model_index(model_path)
+            finally:
+                self._rebuilding = False
+            self._rebuild_facets()
+            self._reset_change_log()
+            self._publish_snapshot()
+
+    def _reset_change_log(self):
+        """清空变更日志，之前的版本号全部失效"""
+        self._upsert_log.clear()
+        self._delete_log.clear()
+        self._reset_version = self.library_version
+        event_bus.publish("library_reset", {
+            "instance_id": self.instance_id,
+            "seq": self.library_version
+        })
+
+    def _log_change(self, model_path: str, deleted: bool):
+        """记录模型的最新变更，保持日志按版本号有序"""
+        self.library_version += 1
+        self._snapshot_dirty = True
+        target, other = (self._delete_log, self._upsert_log) if deleted else (self._upsert_log, self._delete_log)
+        other.pop(model_path, None)
+        target.pop(model_path, None)
+        target[model_path] = self.library_version
+        
+        if self._rebuilding:
+            return
+        # 推送给实时订阅者
+        if deleted:
+            event_bus.publish("model_delete", {"seq": self.library_version, "path": model_path})
+        elif self._is_visible(model_path):
+            event_bus.publish("model_upsert", {
+                "seq": self.library_version,
+                "record": dict(self._display_cache[model_path])
+            })
+
+    def get_changes_since(self, since: int, instance_id: Optional[str] = None) -> dict:
+        """获取指定版本号之后变更和删除的模型
+
+        Args:
+            since: 客户端已同步到的版本号
+            instance_id: 客户端记录的实例ID，与当前进程不一致时需要完整重载
+
+        Returns:
+            dict: 包含最新版本号、是否需要重载、变更记录和已删除的模型路径
+        """
+        # 变更日志由写入方维护，读取时短暂持有写入锁以保证版本号与记录一致
+        with self._write_lock:
+            result = {
+                "instance_id": self.instance_id,
+                "seq": self.library_version,
+                "reset": False,
+                "upserts": [],
+                "deleted": [],
+            }
+            if ((instance_id and instance_id != self.instance_id)
+                    or since < self._reset_version or since > self.library_version):
+                result["reset"] = True
+                return result
+            
+            # 日志按版本号递增排列，从尾部向前读取直到早于since
+            for model_path, version in reversed(self._upsert_log.items()):
+                if version <= since:
+                    break
+                record = self._display_cache.get(model_path)
+                if record is not None and self._is_visible(model_path):
+                    result["upserts"].append(dict(record))
+            for model_path, version in reversed(self._delete_log.items()):
+                if version <= since:
+                    break
+                result["deleted"].append(model_path)
+            return result
+
+    def _update_model_index(self, model_path: str):
+        """模型信息变化后，仅刷新该模型的显示缓存"""
+        record = {
+            "path": model_path,
+            **self._build_display_info(model_path)
+        }
+        self._display_cache[model_path] = record
+        self._set_facet_keys(model_path, self._get_facet_keys(record), record.get("size") or 0)
+        self.search_index.update(model_path, self._get_search_fields(model_path))
+        self.path_index.add(model_path)
+        self._set_model_hash(model_path, self.models_info.get(model_path, {}).get("hash"))
+        self._update_similarity(model_path)
+        self._update_tags(model_path)
+        self._log_change(model_path, deleted=False)
+
+    def _drop_model_index(self, model_path: str):
+        """模型被移除后，清除该模型的显示缓存"""
+        self._display_cache.pop(model_path, None)
+        self._set_facet_keys(model_path, None)
+        self.search_index.remove(model_path)
+        self.path_index.remove(model_path)
+        self._set_model_hash(model_path, None)
+        self.similarity_index.remove(model_path)
+        self.tag_index.remove(model_path)
+        self._log_change(model_path, deleted=True)
+
+    def _update_similarity(self, model_path: str):
+        """根据头部签名、训练标签和触发词更新相似度索引"""
+        entry = self.models_info.get(model_path, {})
+        header = entry.get("header") or {}
+        tag_weights = [
+            (tag, math.log1p(count))
+            for tag, count in (header.get("tag_frequency") or {}).items()
+        ]
+        for words in entry.get("info", {}).get("trainedWords") or []:
+            tag_weights.extend((word, 2.0) for word in str(words).split(","))
+        self.similarity_index.update(model_path, header.get("signature"), tag_weights)
+
+    def find_similar_models(self, model_path: str, limit: int = 20) -> dict:
+        """查找结构和训练内容相似的模型"""
+        snapshot = self._snapshot
+        with self._write_lock:
+            matches = self.similarity_index.similar(model_path, limit)
+        return {
+            "path": model_path,
+            "items": [
+                {**snapshot.records[match["path"]], "similarity": match}
+                for match in matches
+                if match["path"] in snapshot.records
+            ]
+        }
+
+    def _update_tags(self, model_path: str):
+        """合并Civitai触发词和safetensors训练标签，更新标签索引"""
+        entry = self.models_info.get(model_path, {})
+        self.tag_index.update(
+            model_path,
+            entry.get("info", {}).get("trainedWords") or [],
+            (entry.get("header") or {}).get("tag_frequency") or {}
+        )
+
+    def get_model_tags(self, model_path: str) -> Optional[dict]:
+        """获取模型的触发词和训练标签，模型不存在时返回None"""
+        record = self._snapshot.records.get(model_path)
+        if record is None:
+            return None
+        with self._write_lock:
+            tags = self.tag_index.get(model_path) or []
+        return {
+            "path": model_path,
+            "name": record.get("name"),
+            "trigger_words": [entry["tag"] for entry in tags if entry["trigger"]],
+            "tags": tags,
+        }
+
+    def find_models_by_tag(self, tag: str, limit: int = 100) -> dict:
+        """查找触发词或训练标签包含指定标签的模型"""
+        snapshot = self._snapshot
+        with self._write_lock:
+            matches = self.tag_index.models_for(tag)
+        items = [
+            {**snapshot.records[model_path], "tag": entry}
+            for model_path, entry in matches
+            if model_path in snapshot.records and self._is_visible(model_path)
+        ]
+        return {"tag": tag, "total": len(items), "items": items[:limit]}
+
+    async def _attach_header_summary(self, file_path: Path):
+        """读取safetensors头部摘要并写入模型信息（只读取头部，不加载权重）"""
+        model_path = str(file_path)
+        if model_path not in self.models_info:
+            return
+        try:
+            loop = asyncio.get_event_loop()
+            summary = await loop.run_in_executor(self.hash_utils.thread_pool, read_header_summary, file_path)
+        except Exception as e:
+            print(f"读取模型头部失败: {file_path.name}, 错误: {str(e)}")
+            return
+        
+        self._update_entry(model_path, header=summary)
+
+    def _update_entry(self, model_path: str, **fields):
+        """更新已有模型信息的字段并刷新索引"""
+        with self._write_lock:
+            entry = self.models_info.get(model_path)
+            if entry:
+                # 记录会被快照共享，替换而不是原地修改
+                self.models_info[model_path] = {**entry, **fields}
+                self._update_model_index(model_path)
+
+    def _set_model_hash(self, model_path: str, model_hash: Optional[str]):
+        """更新哈希索引中模型对应的哈希值"""
+        old_hash = self._model_hashes.pop(model_path, None)
+        if old_hash:
+            paths = self._hash_index.get(old_hash)
+            if paths is not None:
+                paths.discard(model_path)
+                if not paths:
+                    del self._hash_index[old_hash]
+        if model_hash:
+            self._model_hashes[model_path] = model_hash
+            self._hash_index.setdefault(model_hash, set()).add(model_path)
+
+    def find_duplicates(self) -> dict:
+        """根据哈希索引查找内容相同的模型文件，并统计可回收空间
+
+        同一组内已经是硬链接（同一inode）的文件不计入可回收空间。
+        """
+        with self._write_lock:
+            candidates = [
+                (model_hash, sorted(paths))
+                for model_hash, paths in self._hash_index.items()
+                if len(paths) > 1
+            ]
+        
+        groups = []
+        total_reclaimable = 0
+        for model_hash, paths in candidates:
+            files = []
+            inodes = set()
+            for model_path in paths:
+                try:
+                    stat = os.stat(model_path)
+                except OSError:
+                    continue
+                files.append({
+                    "path": model_path,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "linked": (stat.st_dev, stat.st_ino) in inodes,
+                })
+                inodes.add((stat.st_dev, stat.st_ino))
+            # 大小不一致说明记录的哈希已过期，不能视为重复
+            if len(files) < 2 or len({f["size"] for f in files}) != 1:
+                continue
+            
+            reclaimable = files[0]["size"] * (len(inodes) - 1)
+            total_reclaimable += reclaimable
+            groups.append({
+                "hash": model_hash,
+                "size": files[0]["size"],
+                "files": files,
+                "reclaimable_bytes": reclaimable,
+            })
+        
+        groups.sort(key=lambda group: group["reclaimable_bytes"], reverse=True)
+        return {
+            "groups": groups,
+            "group_count": len(groups),
+            "reclaimable_bytes": total_reclaimable,
+        }
+
+    def hardlink_duplicates(self, hashes: Optional[List[str]] = None, dry_run: bool = False) -> dict:
+        """将重复文件替换为指向同一文件的硬链接
+
+        每组保留修改时间最早的文件，其余文件先创建临时硬链接再原子替换，
+        失败时不会丢失原文件。记录的哈希可能已过期或来自附属元数据文件，
+        因此替换前要求文件的大小和修改时间与记录一致，并逐字节比较内容。
+
+        Args:
+            hashes: 只处理指定哈希的重复组，默认处理全部
+            dry_run: 只返回将要执行的操作，不修改文件
+        """
+        report = self.find_duplicates()
+        linked = []
+        errors = []
+        reclaimed = 0
+        
+        for group in report["groups"]:
+            if hashes and group["hash"] not in hashes:
+                continue
+            files = sorted(group["files"], key=lambda f: f["mtime"])
+            keep = files[0]["path"]
+            try:
+                keep_stat = os.stat(keep)
+                self._check_recorded_stat(keep, keep_stat)
+            except OSError as e:
+                errors.extend({"path": file["path"], "error": str(e)} for file in files)
+                continue
+            for file in files[1:]:
+                target = file["path"]
+                try:
+                    target_stat = os.stat(target)
+                    if (target_stat.st_dev, target_stat.st_ino) == (keep_stat.st_dev, keep_stat.st_ino):
+                        continue  # 已经是硬链接
+                    if target_stat.st_dev != keep_stat.st_dev:
+                        raise OSError("文件位于不同的磁盘或分区，无法创建硬链接")
+                    self._check_recorded_stat(target, target_stat)
+                    if not dry_run:
+                        if not filecmp.cmp(keep, target, shallow=False):
+                            raise OSError(f"文件内容与 {keep} 不一致，记录的哈希已过期")
+                        tmp_path = f"{target}.link-tmp"
+                        os.link(keep, tmp_path)
+                        try:
+                            os.replace(tmp_path, target)
+                        except OSError:
+                            os.unlink(tmp_path)
+                            raise
+                        self._refresh_entry_mtime(target)
+                    linked.append({"path": target, "target": keep})
+                    reclaimed += group["size"]
+                except OSError as e:
+                    errors.append({"path": target, "error": str(e)})
+        
+        if linked and not dry_run:
+            self._publish_snapshot()
+            self.save_models_info()
+        return {
+            "dry_run": dry_run,
+            "linked": linked,
+            "errors": errors,
+            "reclaimed_bytes": reclaimed,
+        }
+
+    def _check_recorded_stat(self, model_path: str, stat: os.stat_result):
+        """检查文件的大小和修改时间与扫描时记录的一致，否则记录的哈希不可信"""
+        entry = self.models_info.get(model_path) or {}
+        recorded_mtime = (entry.get("info") or {}).get("mtime")
+        if recorded_mtime != stat.st_mtime or entry.get("size") != stat.st_size:
+            raise OSError("文件在扫描后已被修改，请重新扫描后再操作")
+
+    def _refresh_entry_mtime(self, model_path: str):
+        """文件被替换但内容不变时，更新记录的修改时间，避免下次扫描重新计算哈希"""
+        with self._write_lock:
+            info = self.models_info.get(model_path, {}).get("info", {})
+            if "mtime" in info:
+                self._update_entry(model_path, info={**info, "mtime": os.path.getmtime(model_path)})
+
+    def replace_model_file(self, model_path: str, model_hash: str):
+        """模型文件被替换为内容等价的新文件（如精度转换）后，更新哈希、大小、修改时间和头部摘要"""
+        try:
+            summary = read_header_summary(Path(model_path))
+        except Exception as e:
+            print(f"读取模型头部失败: {Path(model_path).name}, 错误: {str(e)}")
+            summary = None
+        stat = os.stat(model_path)
+        with self._write_lock:
+            entry = self.models_info.get(model_path)
+            if entry is None:
+                return
+            fields = {"hash": model_hash, "size": stat.st_size}
+            info = entry.get("info", {})
+            if "mtime" in info:
+                fields["info"] = {**info, "mtime": stat.st_mtime}
+            if summary is not None:
+                fields["header"] = summary
+            self._update_entry(model_path, **fields)
+            self._publish_snapshot()
+        self.save_models_info()
+
+    def _get_search_fields(self, model_path: str) -> list:
+        """获取模型用于全文检索的字段及权重"""
+        info = self.models_info.get(model_path, {}).get("info", {})
+        model_data = info.get("model", {})
+        tags = model_data.get("tags") or info.get("tags") or []
+        return [
+            (model_data.get("name", ""), 3.0),
+            (Path(model_path).stem, 2.5),
+            (" ".join(info.get("trainedWords") or []), 2.5),
+            (" ".join(str(tag) for tag in tags), 2.0),
+            (info.get("name", ""), 1.5),
+            (strip_html(info.get("description")), 0.5),
+            (strip_html(model_data.get("description")), 0.5),
+        ]
+
+    def search_models(self, query: str, limit: int = 50) -> dict:
+        """按相关度搜索当前模型目录下的模型"""
+        snapshot = self._snapshot
+        # 倒排索引由写入方原地更新，查询时持有写入锁；返回的记录取自快照
+        with self._write_lock:
+            matches = self.search_index.search(query)
+        results = []
+        for model_path, score in matches:
+            if not self._is_visible(model_path):
+                continue
+            record = snapshot.records.get(model_path)
+            if record is not None:
+                results.append((record, score))
+        
+        return {
+            "query": query,
+            "total": len(results),
+            "items": [
+                {**record, "score": round(score, 3)}
+                for record, score in results[:limit]
+            ]
+        }
+
+    def _is_visible(self, model_path: str) -> bool:
+        """判断模型是否位于当前模型目录下"""
+        # 加上分隔符比较，避免 models 误匹配 models2 这类同名前缀目录
+        return not self.models_path or model_path.startswith(os.path.join(str(self.models_path), ""))
+
+    def _iter_model_paths(self, path_index: PathTrie, roots: Optional[List[str]] = None,
+                          folder: Optional[str] = None):
+        """通过目录索引遍历指定根目录（及子文件夹）下的模型路径
+
+        Args:
+            path_index: 要遍历的目录索引（通常取自快照）
+            roots: 根目录列表，默认为当前模型目录，未设置时为全部模型
+            folder: 相对于根目录的子文件夹，如 loras/characters
+        """
+        if not roots:
+            roots = [str(self.models_path)] if self.models_path else [None]
+        seen = set() if len(roots) > 1 else None
+        for root in roots:
+            base = root
+            if folder:
+                base = str(Path(root) / folder) if root else folder
+            for model_path in path_index.iter_paths(base):
+                if seen is not None:
+                    # 组合多个可能嵌套的根目录时去重
+                    if model_path in seen:
+                        continue
+                    seen.add(model_path)
+                yield model_path
+
+    def get_folders(self, root: Optional[str] = None, folder: Optional[str] = None) -> list:
+        """获取目录下的直接子文件夹及其模型数量"""
+        if not root:
+            root = str(self.models_path) if self.models_path else None
+        base = root
+        if folder:
+            base = str(Path(root) / folder) if root else folder
+        return self._snapshot.path_index.list_folders(base)
+
+    def _get_facet_keys(self, record: dict) -> Optional[Dict[str, str]]:
+        """计算模型在各分面维度上的取值，不可见的模型返回None"""
+        model_path = record["path"]
+        if not self._is_visible(model_path):
+            return None
+        
+        # 根目录取模型目录下的第一级文件夹（如 checkpoints、loras），文件夹为所在的相对目录
+        root = "未知"
+        folder = "未知"
+        if self.models_path:
+            relative = Path(model_path[len(str(self.models_path)):].lstrip("/\\"))
+            if len(relative.parts) > 1:
+                root = relative.parts[0]
+                folder = "/".join(relative.parts[:-1])
+        
+        return {
+            "type": record.get("type") or "未知",
+            "baseModel": record.get("baseModel") or "未知",
+            "nsfw": "nsfw" if record.get("nsfw") else "sfw",
+            "root": root,
+            "folder": folder,
+            "precision": record.get("precision") or "未知",
+        }
+
+    def _set_facet_keys(self, model_path: str, keys: Optional[Dict[str, str]], size: int = 0):
+        """用新的分面取值替换模型原有的计数和磁盘占用"""
+        old = self._facet_keys.pop(model_path, None)
+        if old:
+            old_keys, old_size = old
+            for dim in self.FACET_DIMENSIONS:
+                counter = self._facets[dim]
+                counter[old_keys[dim]] -= 1
+                if counter[old_keys[dim]] <= 0:
+                    del counter[old_keys[dim]]
+            for dim in self.STORAGE_DIMENSIONS:
+                totals = self._storage[dim][old_keys[dim]]
+                totals[0] -= 1
+                totals[1] -= old_size
+                if totals[0] <= 0:
+                    del self._storage[dim][old_keys[dim]]
+        if keys:
+            self._facet_keys[model_path] = (keys, size)
+            for dim in self.FACET_DIMENSIONS:
+                self._facets[dim][keys[dim]] += 1
+            for dim in self.STORAGE_DIMENSIONS:
+                totals = self._storage[dim].setdefault(keys[dim], [0, 0])
+                totals[0] += 1
+                totals[1] += size
+
+    def _rebuild_facets(self):
+        """重新计算全部分面计数和磁盘占用"""
+        self._facets = {dim: Counter() for dim in self.FACET_DIMENSIONS}
+        self._storage = {dim: {} for dim in self.STORAGE_DIMENSIONS}
+        self._facet_keys = {}
+        for model_path, record in self._display_cache.items():
+            self._set_facet_keys(model_path, self._get_facet_keys(record), record.get("size") or 0)
+
+    def get_storage_stats(self, top: int = 20) -> dict:
+        """获取当前模型目录的磁盘占用统计
+
+        Args:
+            top: 返回占用最大的模型数量
+        """
+        snapshot = self._snapshot
+        storage = snapshot.storage
+        largest = heapq.nlargest(
+            top,
+            (record for record in snapshot.records.values()
+             if record.get("size") and self._is_visible(record["path"])),
+            key=lambda record: record["size"]
+        )
+        largest = [dict(record) for record in largest]
+        return {
+            "total_bytes": sum(item["bytes"] for item in storage["root"].values()),
+            "model_count": sum(item["count"] for item in storage["root"].values()),
+            **{f"by_{dim}": dict(storage[dim]) for dim in self.STORAGE_DIMENSIONS},
+            "largest": largest,
+            "history": self._load_storage_history(),
+        }
+
+    def get_precision_report(self) -> dict:
+        """列出含有fp32权重的模型及转换为fp16/bf16后可节省的空间（根据safetensors头部）"""
+        snapshot = self._snapshot
+        items = []
+        for model_path, entry in snapshot.entries.items():
+            dtype_bytes = (entry.get("header") or {}).get("dtype_bytes") or {}
+            fp32_bytes = dtype_bytes.get("F32", 0)
+            if not fp32_bytes or not self._is_visible(model_path):
+                continue
+            record = snapshot.records.get(model_path, {})
+            items.append({
+                "path": model_path,
+                "name": record.get("name"),
+                "type": record.get("type"),
+                "precision": record.get("precision"),
+                "size": entry.get("size"),
+                "fp32_bytes": fp32_bytes,
+                "fp32_ratio": round(fp32_bytes / sum(dtype_bytes.values()), 4),
+                # 转换为16位后F32部分减半
+                "savings_bytes": fp32_bytes // 2,
+            })
+        items.sort(key=lambda item: item["savings_bytes"], reverse=True)
+        return {
+            "items": items,
+            "model_count": len(items),
+            "savings_bytes": sum(item["savings_bytes"] for item in items),
+        }
+
+    def _load_storage_history(self) -> list:
+        """加载磁盘占用历史记录"""
+        try:
+            if self.storage_history_file.exists():
+                with open(self.storage_history_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"加载磁盘占用历史失败: {str(e)}")
+        return []
+
+    def _record_storage_history(self):
+        """扫描完成后追加一条磁盘占用记录，用于观察增长趋势"""
+        storage = self._snapshot.storage
+        history = self._load_storage_history()
+        history.append({
+            "time": time.time(),
+            "total_bytes": sum(item["bytes"] for item in storage["root"].values()),
+            "model_count": sum(item["count"] for item in storage["root"].values()),
+            "by_root": {root: item["bytes"] for root, item in storage["root"].items()},
+        })
+        history = history[-self.STORAGE_HISTORY_LIMIT:]
+        try:
+            with open(self.storage_history_file, "w", encoding="utf-8") as f:
+                json.dump(history, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存磁盘占用历史失败: {str(e)}")
+
+    def get_model_facets(self) -> dict:
+        """获取当前模型目录下各筛选维度的计数"""
+        return dict(self._snapshot.facets)
+
+    def _get_precision(self, model_path: str, info: dict, header: Optional[dict] = None) -> str:
+        """获取模型精度，优先使用safetensors头部，其次为Civitai文件元数据，最后从文件名推断"""
+        dtype_bytes = (header or {}).get("dtype_bytes")
+        if dtype_bytes:
+            # 以占用字节最多的数据类型为准
+            dominant = max(dtype_bytes.items(), key=lambda item: item[1])[0]
+            if dominant in self.DTYPE_PRECISIONS:
+                return self.DTYPE_PRECISIONS[dominant]
+        
+        filename = Path(model_path).name
+        files = info.get("files") or []
+        # 优先匹配同名文件，其次取主文件
+        matched = next((f for f in files if f.get("name") == filename), None)
+        if matched is None:
+            matched = next((f for f in files if f.get("primary")), None)
+        if matched:
+            fp = (matched.get("metadata") or {}).get("fp")
+            if fp:
+                return fp
+        
+        lower_name = filename.lower()
+        for token in self.PRECISION_TOKENS:
+            if token in lower_name:
+                return token
+        return "未知"
 
     def _clean_nonexistent_models(self):
         """清理不存在的模型信息"""
@@ -173,11 +1084,14 @@ class ModelManager:
                         image_path.unlink()
         
         # 从字典中移除不存在的模型
-        for path in to_remove:
-            del self.models_info[path]
+        with self._write_lock:
+            for path in to_remove:
+                del self.models_info[path]
+                self._drop_model_index(path)
         
         # 如果有清理，保存更新后的信息
         if to_remove:
+            self._publish_snapshot()
             self.save_models_info()
             print(f"已清理 {len(to_remove)} 个不存在的模型")
 
@@ -217,10 +1131,17 @@ class ModelManager:
             return None
 
     def get_model_display_info(self, model_path: str) -> dict:
-        """获取用于显示的模型信息"""
+        """获取用于显示的模型信息（优先使用快照中的缓存）"""
+        cached = self._snapshot.records.get(model_path)
+        if cached is not None:
+            return dict(cached)
+        return self._build_display_info(model_path)
+
+    def _build_display_info(self, model_path: str) -> dict:
+        """根据模型信息计算显示信息"""
         model_info = self.models_info.get(model_path, {})
-        # 获取自定义NSFW模型列表
-        custom_nsfw_models = self.config_manager.get_custom_nsfw_models()
+        # 使用集合判断是否为自定义NSFW模型
+        is_custom_nsfw = str(model_path) in self._custom_nsfw
         
         if not model_info:
             return {
@@ -230,10 +1151,11 @@ class ModelManager:
                 "preview_url": None,
                 "description": "未找到模型信息",
                 "baseModel": "未知",
-                "nsfw": str(model_path) in custom_nsfw_models,  # 检查是否在自定义NSFW列表中
-                "custom_nsfw": str(model_path) in custom_nsfw_models,  # 新增自定义NSFW标记
+                "nsfw": is_custom_nsfw,  # 检查是否在自定义NSFW列表中
+                "custom_nsfw": is_custom_nsfw,  # 新增自定义NSFW标记
                 "original_nsfw": False,  # 新增原始NSFW标记
                 "nsfwLevel": 0,
+                "precision": self._get_precision(model_path, {}),
             }
         
         info = model_info.get("info", {})
@@ -245,7 +1167,6 @@ class ModelManager:
         local_preview = info.get("local_preview")
         
         # 检查NSFW状态
-        is_custom_nsfw = str(model_path) in custom_nsfw_models
         is_original_nsfw = model_data.get("nsfw", False)
         
         return {
@@ -258,31 +1179,82 @@ class ModelManager:
             "custom_nsfw": is_custom_nsfw,  # 新增自定义NSFW标记
             "original_nsfw": is_original_nsfw,  # 新增原始NSFW标记
             "nsfwLevel": preview_image.get("nsfwLevel", 0),
+            "precision": self._get_precision(model_path, info, model_info.get("header")),
+            "size": model_info.get("size"),
+            **self._get_update_status(info),
         }
 
-    def get_all_models_info(self) -> list:
-        """获取所有模型的显示信息"""
-        if not self.models_path:
-            # 如果模型路径未设置，返回所有模型信息
-            return [
-                {
-                    "path": model_path,
-                    **self.get_model_display_info(model_path)
-                }
-                for model_path in self.models_info.keys()
-            ]
-        
-        # 模型路径已设置，只返回该路径下的模型
-        current_path = str(self.models_path)
+    def _get_update_status(self, info: dict) -> dict:
+        """根据缓存的Civitai版本列表判断已安装的版本是否有更新"""
+        update = self._model_updates.get(str(info.get("modelId")))
+        version_ids = update["version_ids"] if update else []
+        # 版本列表按发布时间从新到旧排列
+        if not version_ids or info.get("id") not in version_ids or info.get("id") == version_ids[0]:
+            return {"update_available": False}
+        return {"update_available": True, "latest_version": update["latest_version"]}
+
+    def get_installed_model_ids(self) -> Dict[str, set]:
+        """获取已安装模型的Civitai模型ID及对应的已安装版本ID"""
+        installed: Dict[str, set] = {}
+        for entry in self._snapshot.entries.values():
+            info = entry.get("info", {})
+            if info.get("modelId") is not None:
+                installed.setdefault(str(info["modelId"]), set()).add(info.get("id"))
+        return installed
+
+    def set_model_updates(self, updates: Dict[str, dict]):
+        """写入Civitai版本列表，并刷新受影响模型的显示信息"""
+        with self._write_lock:
+            self._model_updates.update(updates)
+            for model_path, entry in self.models_info.items():
+                info = entry.get("info", {})
+                if str(info.get("modelId")) not in updates:
+                    continue
+                status = self._get_update_status(info)
+                record = self._display_cache.get(model_path, {})
+                # 只刷新更新状态发生变化的模型，避免产生无意义的变更记录
+                if (record.get("update_available") != status["update_available"]
+                        or record.get("latest_version") != status.get("latest_version")):
+                    self._update_model_index(model_path)
+            self._publish_snapshot()
+
+    def get_all_models_info(self, roots: Optional[List[str]] = None, folder: Optional[str] = None,
+                            snapshot: Optional[LibrarySnapshot] = None) -> list:
+        """获取所有模型的显示信息
+
+        返回缓存记录的浅拷贝，调用方修改返回值不会影响缓存和快照。
+
+        Args:
+            roots: 要返回的根目录列表，默认为当前模型目录，未设置时返回全部模型
+            folder: 相对于根目录的子文件夹，只返回该文件夹下的模型
+            snapshot: 指定读取的快照，默认为当前快照
+        """
+        snapshot = snapshot or self._snapshot
+        records = snapshot.records
         return [
-            {
-                "path": model_path,
-                **self.get_model_display_info(model_path)
-            }
-            for model_path in self.models_info.keys()
-            if str(model_path).startswith(current_path)
+            dict(records[model_path])
+            for model_path in self._iter_model_paths(snapshot.path_index, roots, folder)
+            if model_path in records
         ]
 
+    def iter_models_info(self, include_info: bool = False):
+        """逐条生成当前模型目录下的模型记录，不构建完整列表
+
+        Args:
+            include_info: 是否附带原始的Civitai模型信息
+        """
+        # 整个导出过程使用同一个快照，扫描进行中也能得到一致的结果
+        snapshot = self._snapshot
+        for model_path in self._iter_model_paths(snapshot.path_index):
+            record = snapshot.records.get(model_path)
+            if record is None:
+                continue
+            entry = snapshot.entries.get(model_path, {})
+            export_record = {**record, "hash": entry.get("hash", record.get("hash"))}
+            if include_info:
+                export_record["info"] = entry.get("info", {})
+            yield export_record
+
     def toggle_custom_nsfw(self, model_path: str) -> bool:
         """切换模型的自定义NSFW状态
         
@@ -305,5 +1277,9 @@ class ModelManager:
             if is_original_nsfw:
                 return True  # 保持NSFW状态
         
-        # 使用配置管理器切换NSFW状态
-        return self.config_manager.toggle_model_nsfw(model_path)
\ No newline at end of file
+        # 使用配置管理器切换NSFW状态，并同步本地集合（仅刷新受影响模型的缓存）
+        self.config_manager.toggle_model_nsfw(model_path)
+        self._sync_custom_nsfw(self.config_manager.get_custom_nsfw_models())
+        is_nsfw = model_path in self._custom_nsfw
+        event_bus.publish("nsfw_toggled", {"path": model_path, "custom_nsfw": is_nsfw})
+        return is_nsfw
\ No newline at end of file
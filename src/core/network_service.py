@@ -3,6 +3,8 @@ import aiohttp
 import time
 from typing import Dict, Any
 
+from src.core.event_bus import event_bus
+
 # 检测目标配置
 NETWORK_TARGETS = {
     "civitai": {
@@ -136,6 +138,7 @@ class NetworkService:
             }
             
             print("网络状态检测完成")
+            event_bus.publish("network_status", self.network_status_cache)
             return results
         except Exception as e:
             print(f"网络状态检测失败: {str(e)}")
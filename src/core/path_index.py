@@ -0,0 +1,120 @@
+from pathlib import PurePath
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class _FolderNode:
+    """目录节点：子目录、直接位于该目录下的模型路径及子树模型总数"""
+    __slots__ = ("children", "items", "count")
+
+    def __init__(self):
+        self.children: Dict[str, "_FolderNode"] = {}
+        self.items: Dict[str, None] = {}  # 使用字典保持插入顺序
+        self.count = 0
+
+
+class PathTrie:
+    """按目录层级索引模型路径的前缀树
+
+    可以直接取出某个根目录或子目录（如 loras/characters）下的模型，
+    无需遍历全部模型做字符串前缀匹配。
+    """
+
+    def __init__(self):
+        self._root = _FolderNode()
+
+    def __len__(self) -> int:
+        return self._root.count
+
+    @staticmethod
+    def split(path: str) -> Tuple[str, ...]:
+        """将路径拆分为各级目录名"""
+        return PurePath(path).parts
+
+    def _find(self, folder: Optional[str]) -> Optional[_FolderNode]:
+        """查找目录对应的节点，folder为空时返回根节点"""
+        node = self._root
+        if not folder:
+            return node
+        for part in self.split(folder):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def add(self, path: str):
+        """添加模型路径，已存在时忽略"""
+        node = self._root
+        chain = [node]
+        for part in self.split(path)[:-1]:
+            node = node.children.setdefault(part, _FolderNode())
+            chain.append(node)
+        if path in node.items:
+            return
+
+        for folder_node in chain:
+            folder_node.count += 1
+        node.items[path] = None
+
+    def remove(self, path: str):
+        """移除模型路径，并清理不再包含模型的目录节点"""
+        parts = self.split(path)
+        chain = [self._root]
+        for part in parts[:-1]:
+            node = chain[-1].children.get(part)
+            if node is None:
+                return
+            chain.append(node)
+        if path not in chain[-1].items:
+            return
+
+        del chain[-1].items[path]
+        for node in chain:
+            node.count -= 1
+        # 自底向上删除空目录
+        for parent, part, node in zip(reversed(chain[:-1]), reversed(parts[:-1]), reversed(chain[1:])):
+            if node.count == 0:
+                del parent.children[part]
+
+    def clear(self):
+        """清空索引"""
+        self._root = _FolderNode()
+
+    def copy(self) -> "PathTrie":
+        """复制整个索引，用于发布不可变快照"""
+        trie = PathTrie()
+        stack = [(self._root, trie._root)]
+        while stack:
+            source, target = stack.pop()
+            target.items = dict(source.items)
+            target.count = source.count
+            for name, child in source.children.items():
+                target.children[name] = _FolderNode()
+                stack.append((child, target.children[name]))
+        return trie
+
+    def iter_paths(self, folder: Optional[str] = None) -> Iterator[str]:
+        """按目录深度优先遍历指定目录下的所有模型路径"""
+        node = self._find(folder)
+        if node is None:
+            return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            # 在迭代前复制，允许遍历过程中索引被修改
+            yield from tuple(node.items)
+            stack.extend(reversed(tuple(node.children.values())))
+
+    def count(self, folder: Optional[str] = None) -> int:
+        """获取指定目录下的模型数量"""
+        node = self._find(folder)
+        return node.count if node else 0
+
+    def list_folders(self, folder: Optional[str] = None) -> List[dict]:
+        """列出指定目录的直接子目录及其模型数量"""
+        node = self._find(folder)
+        if node is None:
+            return []
+        return [
+            {"name": name, "count": child.count}
+            for name, child in sorted(node.children.items())
+        ]
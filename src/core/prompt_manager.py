@@ -1,5 +1,11 @@
+import os
+from src.core.translation_cache import TranslationCache
 from src.core.translation_service import TranslationService
 
 class PromptManager:
-    def __init__(self, config_file="config.json"):
-        self.translator = TranslationService() 
\ No newline at end of file
+    def __init__(self, config_file="config.json", data_dir=None):
+        # 指定数据目录时启用持久化的翻译缓存
+        self.translation_cache = None
+        if data_dir:
+            self.translation_cache = TranslationCache(os.path.join(data_dir, "translation_cache.db"))
+        self.translator = TranslationService(cache=self.translation_cache)
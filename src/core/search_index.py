@@ -0,0 +1,195 @@
+import re
+import html
+from bisect import bisect_left
+from typing import Dict, List, Set, Tuple, Iterable
+
+# 分词：按非字母数字字符切分（下划线也视为分隔符）
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+# 去除描述中的HTML标签
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+# 连续的中日韩文字（没有空格分词，需要切分为二元组）
+CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+# 不同匹配方式的得分系数
+EXACT_FACTOR = 1.0
+PREFIX_FACTOR = 0.7
+TRIGRAM_FACTOR = 0.4
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为小写词元"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def strip_html(text: str) -> str:
+    """去除HTML标签并还原实体字符"""
+    if not text:
+        return ""
+    return html.unescape(HTML_TAG_PATTERN.sub(" ", str(text)))
+
+
+def cjk_bigrams(text: str, with_unigrams: bool = False) -> str:
+    """将文本中连续的中文切分为以空格分隔的二元组，其他文字保持不变
+
+    二元组之间按“全部匹配”搜索，相当于子串匹配。建立索引时传入 with_unigrams=True
+    同时写入单字，使单个汉字的查询也能命中。
+    """
+    def split(match) -> str:
+        run = match.group(0)
+        if len(run) == 1:
+            return f" {run} "
+        grams = [run[i:i + 2] for i in range(len(run) - 1)]
+        if with_unigrams:
+            grams.extend(run)
+        return " " + " ".join(grams) + " "
+
+    return CJK_PATTERN.sub(split, text or "")
+
+
+def trigrams(token: str) -> Set[str]:
+    """获取词元的三元组集合"""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """内存倒排索引，支持精确、前缀和三元组（子串）匹配
+
+    文档以 (文本, 权重) 列表的形式写入，同一词元在文档中取最高的字段权重。
+    支持按文档增量更新和删除。
+    """
+
+    def __init__(self, max_expansions: int = 200, exact_cjk: bool = False):
+        # 每个查询词最多展开的候选词元数量，避免过短的前缀拖慢查询
+        self.max_expansions = max_expansions
+        # 中文已由 cjk_bigrams 切分为二元组和单字时，中文查询词只需精确匹配
+        self.exact_cjk = exact_cjk
+        self._postings: Dict[str, Dict[str, float]] = {}  # 词元 -> {文档ID: 权重}
+        self._doc_tokens: Dict[str, Dict[str, float]] = {}  # 文档ID -> {词元: 权重}
+        self._trigram_tokens: Dict[str, Set[str]] = {}  # 三元组 -> 词元集合
+        self._sorted_tokens: List[str] = []
+        self._sorted_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def update(self, doc_id: str, fields: Iterable[Tuple[str, float]]):
+        """写入或替换文档的索引内容"""
+        tokens: Dict[str, float] = {}
+        for text, weight in fields:
+            for token in tokenize(text):
+                if weight > tokens.get(token, 0):
+                    tokens[token] = weight
+
+        old_tokens = self._doc_tokens.get(doc_id)
+        if old_tokens == tokens:
+            return
+        if old_tokens:
+            self.remove(doc_id)
+
+        self._doc_tokens[doc_id] = tokens
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for gram in trigrams(token):
+                    self._trigram_tokens.setdefault(gram, set()).add(token)
+                self._sorted_dirty = True
+            postings[doc_id] = weight
+
+    def remove(self, doc_id: str):
+        """从索引中删除文档"""
+        tokens = self._doc_tokens.pop(doc_id, None)
+        if not tokens:
+            return
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                # 词元不再被任何文档使用，同时清理三元组
+                del self._postings[token]
+                for gram in trigrams(token):
+                    gram_tokens = self._trigram_tokens.get(gram)
+                    if gram_tokens is not None:
+                        gram_tokens.discard(token)
+                        if not gram_tokens:
+                            del self._trigram_tokens[gram]
+                self._sorted_dirty = True
+
+    def clear(self):
+        """清空索引"""
+        self._postings = {}
+        self._doc_tokens = {}
+        self._trigram_tokens = {}
+        self._sorted_tokens = []
+        self._sorted_dirty = False
+
+    def _expand(self, term: str) -> Dict[str, float]:
+        """将查询词展开为候选词元及其匹配系数"""
+        candidates: Dict[str, float] = {}
+        if term in self._postings:
+            candidates[term] = EXACT_FACTOR
+        if self.exact_cjk and CJK_PATTERN.fullmatch(term):
+            return candidates
+
+        # 前缀匹配：在有序词表上二分查找
+        if self._sorted_dirty:
+            self._sorted_tokens = sorted(self._postings)
+            self._sorted_dirty = False
+        start = bisect_left(self._sorted_tokens, term)
+        for token in self._sorted_tokens[start:start + self.max_expansions]:
+            if not token.startswith(term):
+                break
+            candidates.setdefault(token, PREFIX_FACTOR)
+
+        # 子串匹配：候选词元必须包含查询词的全部三元组
+        grams = trigrams(term)
+        if grams and len(candidates) < self.max_expansions:
+            gram_sets = sorted(
+                (self._trigram_tokens.get(gram, set()) for gram in grams),
+                key=len
+            )
+            matched = set(gram_sets[0])
+            for gram_set in gram_sets[1:]:
+                matched &= gram_set
+                if not matched:
+                    break
+            for token in matched:
+                if term in token:
+                    candidates.setdefault(token, TRIGRAM_FACTOR)
+                    if len(candidates) >= self.max_expansions:
+                        break
+        return candidates
+
+    def search(self, query: str) -> List[Tuple[str, float]]:
+        """搜索文档，所有查询词都必须匹配，按得分从高到低返回 (文档ID, 得分)"""
+        return sorted(self.scores(query).items(), key=lambda item: item[1], reverse=True)
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """计算匹配全部查询词的文档得分（未排序），只需要前几条结果时由调用方选取"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return {}
+
+        scores: Dict[str, float] = {}
+        for i, term in enumerate(terms):
+            term_scores: Dict[str, float] = {}
+            for token, factor in self._expand(term).items():
+                for doc_id, weight in self._postings[token].items():
+                    if i > 0 and doc_id not in scores:
+                        continue
+                    score = weight * factor
+                    if score > term_scores.get(doc_id, 0):
+                        term_scores[doc_id] = score
+
+            if i == 0:
+                scores = term_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score for doc_id, score in term_scores.items()}
+            if not scores:
+                return {}
+
+        return scores
@@ -0,0 +1,127 @@
+import math
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 内容向量（训练标签和触发词）的维度
+CONTENT_DIM = 256
+# 结构得分与内容得分的权重
+STRUCTURE_WEIGHT = 0.4
+CONTENT_WEIGHT = 0.6
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """L2归一化，零向量保持不变"""
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+def content_vector(tag_weights: Iterable[Tuple[str, float]]) -> np.ndarray:
+    """将标签及权重哈希为固定维度的内容向量"""
+    vector = np.zeros(CONTENT_DIM, dtype=np.float32)
+    for tag, weight in tag_weights:
+        tag = tag.strip().lower().replace("_", " ")
+        if tag:
+            vector[zlib.crc32(tag.encode("utf-8")) % CONTENT_DIM] += weight
+    return _normalize(vector)
+
+
+class SimilarityIndex:
+    """基于NumPy矩阵的模型相似度索引
+
+    每个模型一行：结构签名向量（来自safetensors头部）和内容向量（训练标签与触发词），
+    两部分分别做余弦相似度后加权合并。行在原地更新，删除的行放回空闲列表复用。
+    """
+
+    def __init__(self, structure_dim: int, initial_capacity: int = 1024):
+        self.structure_dim = structure_dim
+        self._structure = np.zeros((initial_capacity, structure_dim), dtype=np.float32)
+        self._content = np.zeros((initial_capacity, CONTENT_DIM), dtype=np.float32)
+        self._row_of: Dict[str, int] = {}
+        self._paths: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def _allocate_row(self) -> int:
+        """分配一行，容量不足时成倍扩容"""
+        if self._free_rows:
+            return self._free_rows.pop()
+        row = len(self._paths)
+        if row >= self._structure.shape[0]:
+            capacity = self._structure.shape[0] * 2
+            self._structure = np.resize(self._structure, (capacity, self.structure_dim))
+            self._content = np.resize(self._content, (capacity, CONTENT_DIM))
+            self._structure[row:] = 0
+            self._content[row:] = 0
+        self._paths.append(None)
+        return row
+
+    def update(self, model_path: str, signature: Optional[List[int]],
+               tag_weights: Iterable[Tuple[str, float]]):
+        """写入或更新模型的向量，没有任何特征时从索引中移除"""
+        structure = np.zeros(self.structure_dim, dtype=np.float32)
+        if signature and len(signature) == self.structure_dim:
+            structure = _normalize(np.asarray(signature, dtype=np.float32))
+        content = content_vector(tag_weights)
+        if not structure.any() and not content.any():
+            self.remove(model_path)
+            return
+
+        row = self._row_of.get(model_path)
+        if row is None:
+            row = self._allocate_row()
+            self._row_of[model_path] = row
+            self._paths[row] = model_path
+        self._structure[row] = structure
+        self._content[row] = content
+
+    def remove(self, model_path: str):
+        """从索引中移除模型"""
+        row = self._row_of.pop(model_path, None)
+        if row is None:
+            return
+        self._structure[row] = 0
+        self._content[row] = 0
+        self._paths[row] = None
+        self._free_rows.append(row)
+
+    def clear(self):
+        """清空索引"""
+        self.__init__(self.structure_dim)
+
+    def similar(self, model_path: str, limit: int = 20) -> List[dict]:
+        """查找与指定模型最相似的模型
+
+        Returns:
+            list: 按综合得分降序排列，包含 path、score、structure、content
+        """
+        row = self._row_of.get(model_path)
+        if row is None:
+            return []
+        size = len(self._paths)
+        structure_scores = self._structure[:size] @ self._structure[row]
+        content_scores = self._content[:size] @ self._content[row]
+        scores = STRUCTURE_WEIGHT * structure_scores + CONTENT_WEIGHT * content_scores
+        scores[row] = -math.inf
+        for free_row in self._free_rows:
+            scores[free_row] = -math.inf
+
+        limit = min(limit, len(self._row_of) - 1)
+        if limit <= 0:
+            return []
+        # 先用 argpartition 取前 limit 个，再排序
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "path": self._paths[i],
+                "score": round(float(scores[i]), 4),
+                "structure": round(float(structure_scores[i]), 4),
+                "content": round(float(content_scores[i]), 4),
+            }
+            for i in top
+            if self._paths[i] is not None and scores[i] > 0
+        ]
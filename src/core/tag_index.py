@@ -0,0 +1,78 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_tag(tag: str) -> str:
+    """标签归一化：小写、下划线视为空格、合并空白"""
+    return _WHITESPACE_RE.sub(" ", str(tag).replace("_", " ")).strip().lower()
+
+
+class TagIndex:
+    """模型触发词和训练标签索引
+
+    正向索引保存每个模型合并后的标签列表（Civitai trainedWords 与 ss_tag_frequency），
+    反向索引按归一化后的标签查找使用该标签的模型。
+    """
+
+    def __init__(self):
+        self._model_tags: Dict[str, List[dict]] = {}
+        self._tag_models: Dict[str, Dict[str, dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tag_models)
+
+    def update(self, model_path: str, trained_words: Iterable[str], tag_frequency: Dict[str, int]):
+        """写入或更新模型的标签"""
+        self.remove(model_path)
+        tags: Dict[str, dict] = {}
+        # trainedWords 中的一项可能包含多个以逗号分隔的触发词
+        for words in trained_words:
+            for word in str(words).split(","):
+                key = normalize_tag(word)
+                if key and key not in tags:
+                    tags[key] = {"tag": word.strip(), "trigger": True, "count": 0}
+        for tag, count in tag_frequency.items():
+            key = normalize_tag(tag)
+            if not key:
+                continue
+            if key in tags:
+                tags[key] = {**tags[key], "count": tags[key]["count"] + count}
+            else:
+                tags[key] = {"tag": str(tag).strip(), "trigger": False, "count": count}
+        if not tags:
+            return
+
+        # 触发词在前并保持原有顺序，其余按训练集中出现次数降序
+        ordered = sorted(
+            tags.items(),
+            key=lambda item: (0, 0) if item[1]["trigger"] else (1, -item[1]["count"])
+        )
+        self._model_tags[model_path] = [entry for _, entry in ordered]
+        for key, entry in ordered:
+            self._tag_models.setdefault(key, {})[model_path] = entry
+
+    def remove(self, model_path: str):
+        """从索引中移除模型"""
+        for entry in self._model_tags.pop(model_path, ()):
+            key = normalize_tag(entry["tag"])
+            models = self._tag_models.get(key)
+            if models is not None:
+                models.pop(model_path, None)
+                if not models:
+                    del self._tag_models[key]
+
+    def clear(self):
+        """清空索引"""
+        self._model_tags = {}
+        self._tag_models = {}
+
+    def get(self, model_path: str) -> Optional[List[dict]]:
+        """获取模型的标签列表，模型没有任何标签时返回None"""
+        return self._model_tags.get(model_path)
+
+    def models_for(self, tag: str) -> List[Tuple[str, dict]]:
+        """查找使用指定标签的模型，触发词匹配优先，其次按出现次数降序"""
+        models = self._tag_models.get(normalize_tag(tag), {})
+        return sorted(models.items(), key=lambda item: (not item[1]["trigger"], -item[1]["count"]))
@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 内存中保留的最近使用的翻译条数
+MEMORY_CACHE_SIZE = 10000
+# SQLite 单条语句的参数数量上限较低，批量查询时分批
+QUERY_BATCH_SIZE = 500
+
+
+def normalize_text(text: str) -> str:
+    """规范化待翻译文本：统一全角半角、合并空白并忽略大小写"""
+    return " ".join(unicodedata.normalize("NFKC", text).split()).casefold()
+
+
+def direction_of(to_english: bool) -> str:
+    """翻译方向标识"""
+    return "zh-en" if to_english else "en-zh"
+
+
+class TranslationCache:
+    """两级翻译缓存
+
+    按 (翻译方向, 规范化后的原文) 缓存翻译结果：内存中的LRU缓存最近使用的条目，
+    SQLite数据库持久保存全部结果，重启后仍然有效。记录各级命中次数用于统计命中率。
+    """
+
+    def __init__(self, db_path: str, memory_size: int = MEMORY_CACHE_SIZE):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "direction TEXT NOT NULL, source TEXT NOT NULL, translated TEXT NOT NULL, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (direction, source))"
+        )
+        self._conn.commit()
+
+    def _remember(self, key: Tuple[str, str], translated: str):
+        """写入内存缓存，超出容量时淘汰最久未使用的条目"""
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: Iterable[str], to_english: bool) -> Dict[str, str]:
+        """查询多个文本的缓存翻译
+
+        Returns:
+            dict: 原文 -> 翻译结果，只包含命中缓存的文本
+        """
+        direction = direction_of(to_english)
+        found: Dict[str, str] = {}
+        pending: Dict[str, List[str]] = {}  # 规范化文本 -> 原文列表
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                key = (direction, normalize_text(text))
+                translated = self._memory.get(key)
+                if translated is not None:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    found[text] = translated
+                else:
+                    pending.setdefault(key[1], []).append(text)
+
+            sources = list(pending)
+            for i in range(0, len(sources), QUERY_BATCH_SIZE):
+                batch = sources[i:i + QUERY_BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT source, translated FROM translations "
+                    f"WHERE direction = ? AND source IN ({','.join('?' * len(batch))})",
+                    [direction, *batch]
+                ).fetchall()
+                for source, translated in rows:
+                    self._remember((direction, source), translated)
+                    for text in pending.pop(source):
+                        self.stats["disk_hits"] += 1
+                        found[text] = translated
+
+            self.stats["misses"] += sum(len(originals) for originals in pending.values())
+        return found
+
+    def get(self, text: str, to_english: bool) -> Optional[str]:
+        """查询单个文本的缓存翻译"""
+        return self.get_many([text], to_english).get(text)
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]], to_english: bool):
+        """保存翻译结果，空结果不缓存"""
+        direction = direction_of(to_english)
+        now = time.time()
+        rows = [
+            (direction, normalize_text(text), translated, now)
+            for text, translated in pairs
+            if text and text.strip() and translated
+        ]
+        if not rows:
+            return
+        with self._lock:
+            for direction, source, translated, _ in rows:
+                self._remember((direction, source), translated)
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO translations (direction, source, translated, updated_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+            except sqlite3.Error as e:
+                print(f"保存翻译缓存失败: {str(e)}")
+
+    def put(self, text: str, translated: str, to_english: bool):
+        """保存单个翻译结果"""
+        self.put_many([(text, translated)], to_english)
+
+    def invalidate(self, text: str, to_english: bool) -> bool:
+        """删除单个文本的缓存翻译，返回是否存在"""
+        key = (direction_of(to_english), normalize_text(text))
+        with self._lock:
+            in_memory = self._memory.pop(key, None) is not None
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM translations WHERE direction = ? AND source = ?", key
+                ).rowcount
+        return in_memory or deleted > 0
+
+    def clear(self) -> int:
+        """清空全部缓存和命中统计，返回删除的条目数量"""
+        with self._lock:
+            self._memory.clear()
+            self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+            with self._conn:
+                return self._conn.execute("DELETE FROM translations").rowcount
+
+    def get_stats(self) -> dict:
+        """获取缓存命中统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            memory_entries = len(self._memory)
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        return {
+            **stats,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "memory_size": self.memory_size,
+            "disk_entries": disk_entries,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -3,10 +3,13 @@ from typing import List, Tuple, Optional
 import time
 import asyncio
 
+from src.core.translation_cache import normalize_text
+
 class TranslationService:
-    def __init__(self, max_retries=3, retry_delay=1):
+    def __init__(self, max_retries=3, retry_delay=1, cache=None):
         self.max_retries = max_retries  # 最大重试次数
         self.retry_delay = retry_delay  # 重试延迟（秒）
+        self.cache = cache  # 翻译缓存（TranslationCache），为None时每次都请求翻译服务
         self.init_translators()
         
     def init_translators(self):
@@ -20,14 +23,22 @@ class TranslationService:
             return False
     
     def translate_text(self, text: str, to_english: bool = False) -> str:
-        """翻译单个文本，支持重试"""
+        """翻译单个文本，优先使用缓存，支持重试"""
         if not text or len(text.strip()) == 0:
             return ""
+        
+        if self.cache is not None:
+            cached = self.cache.get(text, to_english)
+            if cached is not None:
+                return cached
             
         for attempt in range(self.max_retries):
             try:
                 translator = self.zh_to_en if to_english else self.en_to_zh
-                return translator.translate(text)
+                result = translator.translate(text)
+                if self.cache is not None:
+                    self.cache.put(text, result, to_english)
+                return result
             except Exception as e:
                 # 最后一次尝试失败，抛出异常
                 if attempt == self.max_retries - 1:
@@ -41,14 +52,48 @@ class TranslationService:
                     self.init_translators()
     
     def batch_translate(self, texts: List[str], to_english: bool = False) -> List[str]:
-        """批量翻译文本，支持重试"""
+        """批量翻译文本，只请求缓存中没有的文本（去重后），支持重试"""
         if not texts:
             return []
+        if self.cache is None:
+            return self._batch_translate(texts, to_english)[0]
+        
+        non_empty = [t for t in texts if t and len(t.strip()) > 0]
+        translations = self.cache.get_many(non_empty, to_english)
+        # 规范化后相同的文本只翻译一次
+        missing = {}
+        for t in non_empty:
+            if t not in translations:
+                missing.setdefault(normalize_text(t), t)
+        if missing:
+            results, valid = self._batch_translate(list(missing.values()), to_english)
+            by_key = {}
+            for key, text, result, ok in zip(missing, missing.values(), results, valid):
+                # 条目数不一致的批次无法确定对应关系，逐条重新翻译后再缓存
+                by_key[key] = result if ok else self.translate_text(text, to_english)
+            self.cache.put_many(
+                ((text, result) for text, result, ok in zip(missing.values(), results, valid) if ok),
+                to_english
+            )
+            for t in non_empty:
+                if t not in translations:
+                    translations[t] = by_key[normalize_text(t)]
+        return [translations.get(t, "") if t and len(t.strip()) > 0 else "" for t in texts]
+    
+    def _batch_translate(self, texts: List[str], to_english: bool = False) -> Tuple[List[str], List[bool]]:
+        """请求翻译服务批量翻译文本，支持重试
+
+        Returns:
+            tuple: (翻译结果, 每个结果是否可靠)；翻译服务合并或拆分了行的批次，
+                   结果经过填充或截断，与原文的对应关系不可靠
+        """
+        if not texts:
+            return [], []
             
         # 过滤空文本
         filtered_texts = [t for t in texts if t and len(t.strip()) > 0]
         if not filtered_texts:
-            return [""] * len(texts)
+            return [""] * len(texts), [False] * len(texts)
             
         for attempt in range(self.max_retries):
             try:
@@ -56,6 +101,7 @@ class TranslationService:
                 # 分批处理，每批最多5个文本
                 batch_size = 5
                 results = []
+                valid = []
                 
                 for i in range(0, len(filtered_texts), batch_size):
                     batch = filtered_texts[i:i+batch_size]
@@ -69,6 +115,7 @@ class TranslationService:
                     batch_results = [r.strip() for r in translated.split("\n")]
                     
                     # 确保返回结果数量与输入相同
+                    valid.extend([len(batch_results) == len(batch)] * len(batch))
                     if len(batch_results) != len(batch):
                         print(f"警告: 翻译返回的条目数 ({len(batch_results)}) 与请求的条目数 ({len(batch)}) 不一致")
                         # 尝试填充或截断结果以匹配输入数量
@@ -85,18 +132,22 @@ class TranslationService:
                 
                 # 恢复原始顺序和空文本占位
                 final_results = []
+                final_valid = []
                 result_index = 0
                 for text in texts:
                     if text and len(text.strip()) > 0:
                         if result_index < len(results):
                             final_results.append(results[result_index])
+                            final_valid.append(valid[result_index])
                             result_index += 1
                         else:
                             final_results.append("")  # 安全处理：如果结果不足
+                            final_valid.append(False)
                     else:
                         final_results.append("")
+                        final_valid.append(False)
                 
-                return final_results
+                return final_results, final_valid
                 
             except Exception as e:
                 # 最后一次尝试失败，抛出异常
@@ -10,12 +10,12 @@ import asyncio
 from datetime import datetime
 from urllib.parse import urlparse, unquote
 
-from src.core.config_manager import ConfigManager
+from src.core.config_manager import get_config_manager
+from src.core.event_bus import event_bus
 
 class WebDAVService:
     def __init__(self, config_file="config.json"):
-        self.config_manager = ConfigManager(config_file)
-        self.config = self.config_manager.get_config()
+        self.config_manager = get_config_manager(config_file)
         # 确保data目录存在
         self.data_dir = Path("data")
         self.data_dir.mkdir(parents=True, exist_ok=True)
@@ -37,6 +37,11 @@ class WebDAVService:
             file_handler.setLevel(logging.DEBUG)
             self.logger.addHandler(file_handler)
         
+    @property
+    def config(self) -> Dict[str, Any]:
+        """当前配置（共享的内存配置，始终为最新值）"""
+        return self.config_manager.get_config()
+        
     def setup_webdav(self, url: str, username: str, password: str) -> bool:
         """设置WebDAV连接信息"""
         webdav_config = {
@@ -127,6 +132,17 @@ class WebDAVService:
             return False
             
     async def backup_data(self) -> Dict[str, Any]:
+        """备份data文件夹到WebDAV服务器，并推送备份结果"""
+        event_bus.publish("backup_status", {"state": "running", **self.get_backup_status()})
+        result = await self._backup_data()
+        event_bus.publish("backup_status", {
+            "state": "success" if result["success"] else "failed",
+            "message": result["message"],
+            **self.get_backup_status()
+        })
+        return result
+
+    async def _backup_data(self) -> Dict[str, Any]:
         """备份data文件夹到WebDAV服务器"""
         if not self.config.get('webdav_enabled', False):
             return {"success": False, "message": "WebDAV未启用"}
@@ -9,11 +9,15 @@ from src.core.webdav_service import WebDAVService
 class BackupService:
     def __init__(self, config_file="config.json"):
         self.webdav_service = WebDAVService(config_file)
-        self.config = self.webdav_service.config
         self.logger = logging.getLogger(__name__)
         self._running = False
         self._task: Optional[asyncio.Task] = None
         
+    @property
+    def config(self) -> Dict[str, Any]:
+        """当前配置，每次读取都能看到最新的设置"""
+        return self.webdav_service.config
+        
     async def start(self):
         """启动自动备份服务"""
         if self._running:
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.core.event_bus import event_bus
+from src.utils.safetensors_utils import (
+    CONVERT_TARGETS,
+    SafetensorsConversionError,
+    convert_safetensors,
+    verify_conversion,
+)
+
+# 保留的已结束任务数量
+JOB_HISTORY_LIMIT = 50
+
+
+class ConversionService:
+    """模型精度转换任务
+
+    将fp32模型流式转换为fp16/bf16，校验通过后替换原文件，默认保留原文件备份。
+    任务依次执行，避免同时占用大量磁盘读写。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.logger = logging.getLogger(__name__)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+
+    def submit(self, model_path: str, target: str = "F16", keep_backup: bool = True) -> Dict[str, Any]:
+        """提交转换任务
+
+        Raises:
+            ValueError: 模型不存在、不是safetensors文件或没有fp32权重
+        """
+        target = target.upper()
+        if target not in CONVERT_TARGETS:
+            raise ValueError(f"不支持的目标精度: {target}")
+        entry = self.manager.snapshot.entries.get(model_path)
+        if entry is None:
+            raise ValueError("模型不存在")
+        if not model_path.endswith(".safetensors"):
+            raise ValueError("只支持safetensors文件")
+        if not (entry.get("header") or {}).get("dtype_bytes", {}).get("F32"):
+            raise ValueError("模型中没有fp32权重，无需转换")
+        if any(job["path"] == model_path and job["status"] in ("pending", "running", "verifying")
+               for job in self.jobs.values()):
+            raise ValueError("该模型已有进行中的转换任务")
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "path": model_path,
+            "target": target,
+            "keep_backup": keep_backup,
+            "status": "pending",
+            "progress": 0.0,
+            "message": "等待执行",
+            "created_at": time.time(),
+        }
+        self._prune_jobs()
+        self.jobs[job["id"]] = job
+        asyncio.create_task(self._run_job(job))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务状态"""
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        """按提交时间倒序列出任务"""
+        return sorted(self.jobs.values(), key=lambda job: job["created_at"], reverse=True)
+
+    def _prune_jobs(self):
+        """清理过多的已结束任务"""
+        finished = [job for job in self.list_jobs() if job["status"] in ("completed", "failed")]
+        for job in finished[JOB_HISTORY_LIMIT:]:
+            del self.jobs[job["id"]]
+
+    def _update_job(self, job: Dict[str, Any], **fields):
+        """更新任务状态并推送事件"""
+        job.update(fields)
+        event_bus.publish("conversion_status", dict(job))
+
+    async def _run_job(self, job: Dict[str, Any]):
+        """执行转换任务"""
+        async with self._lock:
+            try:
+                self._update_job(job, status="running", message="正在转换", started_at=time.time())
+                result = await asyncio.to_thread(self._convert, job)
+                self.manager.replace_model_file(job["path"], result["hash"])
+                self._update_job(
+                    job,
+                    status="completed",
+                    progress=1.0,
+                    message="转换完成",
+                    finished_at=time.time(),
+                    **result
+                )
+                self.logger.info(f"模型精度转换完成: {job['path']}, 节省 {result['saved_bytes']} 字节")
+            except Exception as e:
+                self._update_job(job, status="failed", message=str(e), finished_at=time.time())
+                self.logger.error(f"模型精度转换失败: {job['path']}, {str(e)}")
+
+    def _convert(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """转换、校验并替换模型文件（在工作线程中执行）"""
+        source = Path(job["path"])
+        source_size = source.stat().st_size
+        tmp_path = source.with_name(f"{source.name}.converting")
+        backup_path = source.with_name(f"{source.name}.bak")
+
+        if shutil.disk_usage(source.parent).free < source_size:
+            raise SafetensorsConversionError("磁盘剩余空间不足")
+        if job["keep_backup"] and backup_path.exists():
+            raise SafetensorsConversionError(f"备份文件已存在: {backup_path.name}")
+
+        try:
+            # 转换和校验各占一半进度
+            result = convert_safetensors(
+                source, tmp_path, job["target"],
+                progress=lambda value: job.update(progress=round(value / 2, 4))
+            )
+            job.update(status="verifying", message="正在校验")
+            verify_conversion(
+                source, tmp_path, job["target"],
+                progress=lambda value: job.update(progress=round(0.5 + value / 2, 4))
+            )
+            # 校验完成后原文件不应被修改过
+            if source.stat().st_size != source_size:
+                raise SafetensorsConversionError("转换过程中原文件被修改")
+
+            if job["keep_backup"]:
+                # 硬链接保留原文件，随后原子替换，任何时刻原路径上都有完整文件
+                os.link(source, backup_path)
+            try:
+                os.replace(tmp_path, source)
+            except OSError:
+                if job["keep_backup"]:
+                    backup_path.unlink()
+                raise
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+
+        return {
+            "hash": result["hash"],
+            "source_size": source_size,
+            "size": result["size"],
+            "saved_bytes": source_size - result["size"],
+            "converted_tensors": result["converted_tensors"],
+            "backup": str(backup_path) if job["keep_backup"] else None,
+        }
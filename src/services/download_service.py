@@ -0,0 +1,424 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import aiofiles
+import aiohttp
+from aiohttp import ClientTimeout
+
+from src.core.event_bus import event_bus
+
+# 每次读取和写入的块大小
+CHUNK_SIZE = 1024 * 1024
+# 每个分段的最小大小，小文件不拆分
+MIN_SEGMENT_SIZE = 16 * 1024 * 1024
+# 保存下载进度的最短间隔（秒）
+STATE_SAVE_INTERVAL = 2
+# 每个分段的最大重试次数
+MAX_RETRIES = 5
+# 同时进行的下载任务数量
+MAX_CONCURRENT_DOWNLOADS = 2
+# Civitai模型类型对应的模型子目录
+TYPE_FOLDERS = {"Checkpoint": "checkpoints", "LORA": "loras", "LoCon": "loras", "DoRA": "loras"}
+# 不对外返回的任务字段
+PRIVATE_FIELDS = ("segments", "model_info")
+
+
+class DownloadError(Exception):
+    """下载错误"""
+    pass
+
+
+def parse_civitai_source(source: str) -> Optional[Tuple[str, int]]:
+    """从模型版本ID或Civitai链接中解析出 ("version", ID) 或 ("model", ID)"""
+    source = source.strip()
+    if source.isdigit():
+        return "version", int(source)
+    parsed = urlparse(source)
+    if not parsed.netloc.endswith("civitai.com"):
+        return None
+    version_ids = parse_qs(parsed.query).get("modelVersionId")
+    if version_ids and version_ids[0].isdigit():
+        return "version", int(version_ids[0])
+    match = re.search(r"/(?:api/download/models|model-versions)/(\d+)", parsed.path)
+    if match:
+        return "version", int(match.group(1))
+    match = re.search(r"/models/(\d+)", parsed.path)
+    if match:
+        return "model", int(match.group(1))
+    return None
+
+
+def _contiguous_offset(segments: List[dict]) -> int:
+    """获取从文件开头起已连续写入的字节数"""
+    for segment in segments:
+        if segment["end"] is None or segment["offset"] < segment["end"]:
+            return segment["offset"]
+    return segments[-1]["end"] if segments else 0
+
+
+class DownloadService:
+    """模型下载管理
+
+    使用多个HTTP Range分段并行下载到 .part 文件，进度保存在 data/downloads.json，
+    中断后可以从已写入的位置继续。下载过程中按连续写入的位置同步计算SHA256，
+    完成后与Civitai公布的哈希比对，登记到模型库时无需再次读取整个文件。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.config_manager = manager.config_manager
+        self.logger = logging.getLogger(__name__)
+        self.state_file = manager.data_dir / "downloads.json"
+        self.jobs: Dict[str, Dict[str, Any]] = self._load_jobs()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        self._last_save = 0.0
+
+    def _load_jobs(self) -> Dict[str, Dict[str, Any]]:
+        """加载下载任务，上次未完成的任务标记为暂停"""
+        try:
+            if self.state_file.exists():
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    jobs = json.load(f)
+                for job in jobs.values():
+                    if job["status"] in ("pending", "running", "verifying"):
+                        job["status"] = "paused"
+                        job["message"] = "下载被中断，可继续下载"
+                return jobs
+        except Exception as e:
+            self.logger.error(f"加载下载任务失败: {str(e)}")
+        return {}
+
+    def _save_jobs(self, force: bool = True):
+        """保存下载任务及分段进度"""
+        if not force and time.time() - self._last_save < STATE_SAVE_INTERVAL:
+            return
+        try:
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump(self.jobs, f, ensure_ascii=False, indent=2)
+            self._last_save = time.time()
+        except Exception as e:
+            self.logger.error(f"保存下载任务失败: {str(e)}")
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        """去掉内部字段后的任务状态"""
+        return {key: value for key, value in job.items() if key not in PRIVATE_FIELDS}
+
+    def _update_job(self, job: Dict[str, Any], **fields):
+        """更新任务状态，保存并推送事件"""
+        job.update(fields)
+        self._save_jobs()
+        event_bus.publish("download_status", self._public(job))
+
+    def list_jobs(self) -> list:
+        """按提交时间倒序列出下载任务"""
+        jobs = sorted(self.jobs.values(), key=lambda job: job["created_at"], reverse=True)
+        return [self._public(job) for job in jobs]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取下载任务状态"""
+        job = self.jobs.get(job_id)
+        return self._public(job) if job else None
+
+    def _request_headers(self) -> Dict[str, str]:
+        """请求头，配置了Civitai API Key时附带认证信息"""
+        api_key = self.config_manager.get_config().get("civitai_api_key")
+        return {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    def _resolve_target_dir(self, folder: Optional[str], model_type: Optional[str]) -> Path:
+        """确定保存目录：指定的子目录（相对于模型目录），或按模型类型放入 checkpoints/loras"""
+        models_path = self.manager.models_path
+        if not models_path:
+            raise DownloadError("模型路径未设置")
+        if not folder:
+            folder = TYPE_FOLDERS.get(model_type or "")
+            if not folder:
+                raise DownloadError(f"无法确定 {model_type or '未知'} 类型模型的保存目录，请指定目录")
+        # 返回的路径与扫描时一样以模型目录为前缀，不解析符号链接和映射的网络驱动器，
+        # 否则登记的模型路径与模型目录不一致，会被隐藏并在下次扫描时重复登记；
+        # resolve() 只用于检查目录是否位于模型目录下
+        target_dir = Path(os.path.normpath(Path(models_path) / folder))
+        root = Path(models_path).resolve()
+        resolved = target_dir.resolve()
+        if resolved != root and root not in resolved.parents:
+            raise DownloadError("保存目录必须位于模型目录下")
+        return target_dir
+
+    async def _resolve_civitai(self, session: aiohttp.ClientSession, kind: str, ident: int) -> dict:
+        """获取Civitai模型版本信息，只提供模型ID时使用最新版本"""
+        api_base_url = self.manager.api_base_url
+        if kind == "model":
+            async with session.get(f"{api_base_url}/models/{ident}") as response:
+                if response.status != 200:
+                    raise DownloadError(f"获取模型信息失败，状态码: {response.status}")
+                versions = (await response.json()).get("modelVersions") or []
+            if not versions:
+                raise DownloadError("该模型没有可下载的版本")
+            ident = versions[0]["id"]
+        async with session.get(f"{api_base_url}/model-versions/{ident}") as response:
+            if response.status != 200:
+                raise DownloadError(f"获取模型版本信息失败，状态码: {response.status}")
+            return await response.json()
+
+    async def submit(self, source: str, folder: Optional[str] = None, sha256: Optional[str] = None,
+                     filename: Optional[str] = None) -> Dict[str, Any]:
+        """提交下载任务
+
+        Args:
+            source: Civitai模型版本ID、Civitai链接，或任意支持Range的直链
+            folder: 相对于模型目录的保存目录，默认按模型类型放入 checkpoints/loras
+            sha256: 直链下载时用于校验的哈希
+            filename: 直链下载时的文件名，默认取自链接
+        """
+        civitai_source = parse_civitai_source(source)
+        model_info = None
+        if civitai_source:
+            timeout = ClientTimeout(total=30)
+            async with aiohttp.ClientSession(timeout=timeout, headers=self._request_headers()) as session:
+                model_info = await self._resolve_civitai(session, *civitai_source)
+            files = model_info.get("files") or []
+            file = next((f for f in files if f.get("primary")), files[0] if files else None)
+            if not file or not file.get("downloadUrl"):
+                raise DownloadError("该版本没有可下载的文件")
+            url = file["downloadUrl"]
+            filename = file["name"]
+            sha256 = (file.get("hashes") or {}).get("SHA256")
+            model_type = (model_info.get("model") or {}).get("type")
+        else:
+            if urlparse(source).scheme not in ("http", "https"):
+                raise DownloadError("无法识别的下载地址")
+            url = source
+            filename = filename or unquote(Path(urlparse(source).path).name)
+            model_type = None
+            if not folder:
+                raise DownloadError("直链下载需要指定保存目录")
+
+        filename = Path(filename or "").name
+        if not filename:
+            raise DownloadError("无法确定文件名")
+        target = self._resolve_target_dir(folder, model_type) / filename
+        if target.exists():
+            raise DownloadError(f"文件已存在: {target}")
+        if any(job["target"] == str(target) and job["status"] != "completed" for job in self.jobs.values()):
+            raise DownloadError("该文件已在下载任务中")
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "source": source,
+            "url": url,
+            "target": str(target),
+            "expected_hash": sha256.lower() if sha256 else None,
+            "size": None,
+            "downloaded": 0,
+            "connections": 0,
+            "status": "pending",
+            "message": "等待下载",
+            "created_at": time.time(),
+            "segments": [],
+            "model_info": model_info,
+        }
+        self.jobs[job["id"]] = job
+        self._save_jobs()
+        self._start(job)
+        return self._public(job)
+
+    def _start(self, job: Dict[str, Any]):
+        """在后台运行下载任务"""
+        self._tasks[job["id"]] = asyncio.create_task(self._run_job(job))
+
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """继续暂停或失败的任务"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in ("paused", "failed"):
+            self._update_job(job, status="pending", message="等待下载")
+            self._start(job)
+        return self._public(job)
+
+    async def pause(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """暂停任务，已下载的部分保留用于续传"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        task = self._tasks.get(job_id)
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return self._public(job)
+
+    async def remove(self, job_id: str) -> bool:
+        """取消任务并删除未完成的文件"""
+        if await self.pause(job_id) is None:
+            return False
+        job = self.jobs.pop(job_id)
+        if job["status"] != "completed":
+            Path(f"{job['target']}.part").unlink(missing_ok=True)
+        self._save_jobs()
+        return True
+
+    async def _run_job(self, job: Dict[str, Any]):
+        """执行下载任务"""
+        async with self._semaphore:
+            try:
+                self._update_job(job, status="running", message="正在下载", started_at=time.time())
+                timeout = ClientTimeout(total=None, sock_connect=30, sock_read=60)
+                async with aiohttp.ClientSession(timeout=timeout, headers=self._request_headers()) as session:
+                    model_hash = await self._download(session, job)
+
+                self._update_job(job, status="verifying", message="正在校验")
+                if job["expected_hash"] and model_hash != job["expected_hash"]:
+                    # 数据已损坏，续传没有意义
+                    Path(f"{job['target']}.part").unlink(missing_ok=True)
+                    job["segments"] = []
+                    raise DownloadError(f"哈希校验失败: 期望 {job['expected_hash']}，实际 {model_hash}")
+
+                target = Path(job["target"])
+                if target.exists():
+                    raise DownloadError(f"文件已存在: {target}")
+                Path(f"{job['target']}.part").rename(target)
+                await self.manager.register_model_file(target, model_hash, job["model_info"])
+                self._update_job(job, status="completed", message="下载完成", hash=model_hash,
+                                 finished_at=time.time())
+                self.logger.info(f"模型下载完成: {target}")
+            except asyncio.CancelledError:
+                self._update_job(job, status="paused", message="已暂停")
+                raise
+            except Exception as e:
+                self._update_job(job, status="failed", message=str(e))
+                self.logger.error(f"模型下载失败: {job['target']}, {str(e)}")
+            finally:
+                self._tasks.pop(job["id"], None)
+
+    async def _probe(self, session: aiohttp.ClientSession, job: Dict[str, Any]):
+        """获取文件大小并判断服务器是否支持Range，据此划分分段"""
+        async with session.get(job["url"], headers={"Range": "bytes=0-0"}) as response:
+            if response.status == 206:
+                content_range = response.headers.get("Content-Range", "")
+                size = int(content_range.rsplit("/", 1)[-1]) if "/" in content_range else None
+                ranges = size is not None
+            elif response.status == 200:
+                size = response.content_length
+                ranges = False
+            else:
+                raise DownloadError(f"下载请求失败，状态码: {response.status}")
+
+        if not ranges or not size:
+            # 不支持断点续传时只能单连接从头下载
+            job["segments"] = [{"start": 0, "end": size, "offset": 0}]
+        else:
+            connections = max(1, int(self.config_manager.get_config().get("download_connections", 4)))
+            count = max(1, min(connections, size // MIN_SEGMENT_SIZE))
+            step = -(-size // count)
+            job["segments"] = [
+                {"start": start, "end": min(start + step, size), "offset": start}
+                for start in range(0, size, step)
+            ]
+        job["size"] = size
+        job["ranges"] = ranges
+
+    async def _download(self, session: aiohttp.ClientSession, job: Dict[str, Any]) -> str:
+        """下载所有未完成的分段，同时计算SHA256"""
+        part_path = Path(f"{job['target']}.part")
+        if not job["segments"] or not part_path.exists() or not job.get("ranges"):
+            await self._probe(session, job)
+            async with aiofiles.open(part_path, "wb") as f:
+                if job["size"]:
+                    await f.truncate(job["size"])
+
+        segments = job["segments"]
+        pending = [segment for segment in segments
+                   if segment["end"] is None or segment["offset"] < segment["end"]]
+        job["connections"] = len(pending)
+        self._save_jobs()
+
+        segments_done = asyncio.Event()
+        hash_task = asyncio.create_task(self._follow_hash(job, part_path, segments_done))
+        try:
+            await asyncio.gather(*(self._download_segment(session, job, part_path, segment)
+                                   for segment in pending))
+        except BaseException:
+            hash_task.cancel()
+            self._save_jobs()
+            raise
+        if job["size"] is None:
+            # 大小未知的下载从头重试后，去掉上一次写入的多余数据
+            async with aiofiles.open(part_path, "r+b") as f:
+                await f.truncate(segments[0]["offset"])
+            job["size"] = segments[0]["offset"]
+        segments_done.set()
+        return await hash_task
+
+    async def _download_segment(self, session: aiohttp.ClientSession, job: Dict[str, Any],
+                                part_path: Path, segment: dict):
+        """下载一个分段，连接中断时从已写入的位置重试"""
+        for attempt in range(MAX_RETRIES):
+            try:
+                headers = {}
+                if job.get("ranges"):
+                    headers["Range"] = f"bytes={segment['offset']}-{segment['end'] - 1}"
+                async with session.get(job["url"], headers=headers) as response:
+                    if response.status not in (200, 206) or (job.get("ranges") and response.status != 206):
+                        raise DownloadError(f"下载请求失败，状态码: {response.status}")
+                    # 不使用缓冲，保证已计入进度的数据对哈希计算立即可见
+                    async with aiofiles.open(part_path, "r+b", buffering=0) as f:
+                        await f.seek(segment["offset"])
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            if segment["end"] is not None:
+                                chunk = chunk[:segment["end"] - segment["offset"]]
+                            view = memoryview(chunk)
+                            while view:
+                                written = await f.write(view)
+                                view = view[written:]
+                            segment["offset"] += len(chunk)
+                            job["downloaded"] = sum(s["offset"] - s["start"] for s in job["segments"])
+                            self._save_jobs(force=False)
+                            if segment["end"] is not None and segment["offset"] >= segment["end"]:
+                                break
+                if segment["end"] is None or segment["offset"] >= segment["end"]:
+                    return
+                raise DownloadError("连接提前结束")
+            except (aiohttp.ClientError, asyncio.TimeoutError, DownloadError) as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise DownloadError(f"分段下载失败: {str(e)}")
+                self.logger.warning(f"分段下载中断，{2 ** attempt}秒后重试: {str(e)}")
+                if not job.get("ranges"):
+                    # 无法续传，从头开始
+                    segment["offset"] = 0
+                await asyncio.sleep(2 ** attempt)
+
+    async def _follow_hash(self, job: Dict[str, Any], part_path: Path, segments_done: asyncio.Event) -> str:
+        """跟随已连续写入的位置计算SHA256，刚写入的数据通常仍在系统缓存中"""
+        sha256_hash = hashlib.sha256()
+        hashed = 0
+        async with aiofiles.open(part_path, "rb", buffering=0) as f:
+            while True:
+                done = segments_done.is_set()
+                frontier = _contiguous_offset(job["segments"])
+                if hashed > frontier:
+                    # 不支持续传的下载从头重试时重新计算
+                    sha256_hash = hashlib.sha256()
+                    hashed = 0
+                    await f.seek(0)
+                while hashed < frontier:
+                    chunk = await f.read(min(CHUNK_SIZE, frontier - hashed))
+                    if not chunk:
+                        raise DownloadError("读取已下载数据失败")
+                    sha256_hash.update(chunk)
+                    hashed += len(chunk)
+                if done:
+                    return sha256_hash.hexdigest()
+                await asyncio.sleep(0.1)
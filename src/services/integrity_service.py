@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.core.event_bus import event_bus
+
+# 每次读取的块大小
+CHUNK_SIZE = 1024 * 1024
+# 没有待校验的模型时，等待多久再检查（秒）
+IDLE_INTERVAL = 600
+
+
+class VerificationCancelled(Exception):
+    """校验被取消（服务停止）"""
+    pass
+
+
+class IntegrityService:
+    """后台完整性校验服务
+
+    按滚动计划重新计算已记录模型的SHA256并与记录值比对，发现损坏或被截断的文件。
+    读取速度受 integrity_check_mb_per_sec 限制，用户扫描进行中时自动暂停。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.config_manager = manager.config_manager
+        self.logger = logging.getLogger(__name__)
+        self.state_file = manager.data_dir / "integrity_state.json"
+        self.state: Dict[str, Dict[str, Any]] = self._load_state()
+        self.current: Optional[Dict[str, Any]] = None
+        self._priority: list = []
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = threading.Event()
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        """加载校验记录"""
+        try:
+            if self.state_file.exists():
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"加载完整性校验记录失败: {str(e)}")
+        return {}
+
+    def _save_state(self):
+        """保存校验记录"""
+        try:
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"保存完整性校验记录失败: {str(e)}")
+
+    def _get_settings(self) -> Dict[str, Any]:
+        """读取校验相关配置"""
+        config = self.config_manager.get_config()
+        return {
+            "enabled": config.get("integrity_check_enabled", True),
+            "mb_per_sec": max(1, config.get("integrity_check_mb_per_sec", 20)),
+            "interval": config.get("integrity_check_interval_days", 30) * 86400,
+        }
+
+    async def start(self):
+        """启动后台校验"""
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._verify_loop())
+        self.logger.info("完整性校验服务已启动")
+
+    async def stop(self):
+        """停止后台校验"""
+        if not self._running:
+            return
+        self._running = False
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.logger.info("完整性校验服务已停止")
+
+    def request_verification(self, model_path: str) -> bool:
+        """将模型加入优先校验队列"""
+        if model_path not in self.manager.snapshot.entries:
+            return False
+        if model_path not in self._priority:
+            self._priority.append(model_path)
+        return True
+
+    def _next_model(self, interval: float) -> Optional[str]:
+        """选择下一个需要校验的模型：优先队列，其次为最久未校验且已到期的模型"""
+        entries = self.manager.snapshot.entries
+        while self._priority:
+            model_path = self._priority.pop(0)
+            if model_path in entries:
+                return model_path
+
+        now = time.time()
+        candidates = (
+            (self.state.get(model_path, {}).get("verified_at", 0), model_path)
+            for model_path, entry in entries.items()
+            if entry.get("hash")
+        )
+        due = [item for item in candidates if now - item[0] >= interval]
+        return min(due)[1] if due else None
+
+    async def _verify_loop(self):
+        """校验循环"""
+        while self._running:
+            try:
+                settings = self._get_settings()
+                if not settings["enabled"] or self.manager.scanning:
+                    await asyncio.sleep(60)
+                    continue
+
+                model_path = self._next_model(settings["interval"])
+                if model_path is None:
+                    await asyncio.sleep(IDLE_INTERVAL)
+                    continue
+
+                result = await asyncio.to_thread(self.verify_model, model_path, settings["mb_per_sec"])
+                self.state[model_path] = result
+                self._save_state()
+                if result["status"] in ("corrupted", "truncated"):
+                    self.logger.error(f"模型文件校验失败: {model_path}, {result['message']}")
+                    event_bus.publish("integrity_issue", {"path": model_path, **result})
+            except asyncio.CancelledError:
+                raise
+            except VerificationCancelled:
+                break
+            except Exception as e:
+                self.logger.error(f"完整性校验过程中出错: {str(e)}")
+                await asyncio.sleep(300)
+
+    def verify_model(self, model_path: str, mb_per_sec: float) -> Dict[str, Any]:
+        """重新计算模型哈希并与记录比对（在工作线程中执行）"""
+        entry = self.manager.snapshot.entries.get(model_path, {})
+        expected_hash = entry.get("hash")
+        result = {"verified_at": time.time(), "expected_hash": expected_hash}
+
+        try:
+            stat = os.stat(model_path)
+        except FileNotFoundError:
+            return {**result, "status": "missing", "message": "文件不存在"}
+
+        # 文件已被正常修改，交给下一次扫描重新识别
+        recorded_mtime = entry.get("info", {}).get("mtime")
+        if recorded_mtime is not None and recorded_mtime != stat.st_mtime:
+            return {**result, "status": "modified", "message": "文件在记录后被修改，等待重新扫描"}
+
+        recorded_size = entry.get("size")
+        if recorded_size is not None and stat.st_size < recorded_size:
+            return {
+                **result,
+                "status": "truncated",
+                "message": f"文件大小 {stat.st_size} 小于记录的 {recorded_size} 字节"
+            }
+
+        self.current = {"path": model_path, "size": stat.st_size, "read": 0, "started_at": time.time()}
+        try:
+            actual_hash = self._hash_with_budget(Path(model_path), mb_per_sec)
+        finally:
+            self.current = None
+
+        if actual_hash != expected_hash:
+            return {**result, "status": "corrupted", "actual_hash": actual_hash, "message": "哈希值与记录不一致"}
+        return {**result, "status": "ok", "message": "校验通过"}
+
+    def _hash_with_budget(self, file_path: Path, mb_per_sec: float) -> str:
+        """按读取速度上限计算SHA256，扫描进行中时暂停"""
+        budget = mb_per_sec * 1024 * 1024
+        sha256_hash = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while True:
+                if self._stop_event.is_set():
+                    raise VerificationCancelled()
+                # 用户扫描期间让出磁盘带宽
+                while self.manager.scanning and not self._stop_event.is_set():
+                    time.sleep(1)
+
+                chunk_start = time.monotonic()
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256_hash.update(chunk)
+                if self.current is not None:
+                    self.current["read"] += len(chunk)
+
+                # 按预算补足这一块应占用的时间
+                delay = len(chunk) / budget - (time.monotonic() - chunk_start)
+                if delay > 0:
+                    time.sleep(delay)
+        return sha256_hash.hexdigest()
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取校验进度和发现的问题"""
+        entries = self.manager.snapshot.entries
+        counts: Dict[str, int] = {}
+        issues = []
+        for model_path, result in self.state.items():
+            if model_path not in entries:
+                continue
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if result["status"] in ("corrupted", "truncated", "missing"):
+                issues.append({"path": model_path, **result})
+
+        return {
+            "running": self._running,
+            "paused": self.manager.scanning,
+            "settings": self._get_settings(),
+            "model_count": sum(1 for entry in entries.values() if entry.get("hash")),
+            "verified_count": sum(counts.values()),
+            "status_counts": counts,
+            "current": self.current,
+            "issues": sorted(issues, key=lambda item: item["verified_at"], reverse=True),
+        }
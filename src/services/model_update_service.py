@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import ClientTimeout
+
+from src.core.event_bus import event_bus
+
+# 每次批量查询的模型数量（Civitai /models 接口单页上限）
+BATCH_SIZE = 100
+# 两次请求之间的最短间隔（秒）
+REQUEST_INTERVAL = 2
+# 被限流（429）且没有 Retry-After 时的等待时间（秒）
+RATE_LIMIT_BACKOFF = 60
+
+
+class ModelUpdateService:
+    """Civitai模型版本更新检查服务
+
+    按 /models?ids= 批量查询已安装模型所属的Civitai模型，缓存各模型的版本列表，
+    超过 model_update_ttl_hours 后重新查询。请求之间保持间隔，被限流时按 Retry-After 等待。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.config_manager = manager.config_manager
+        self.logger = logging.getLogger(__name__)
+        self.cache_file = manager.data_dir / "model_updates.json"
+        self.cache: Dict[str, Dict[str, Any]] = self._load_cache()
+        self.checking = False
+        self.last_check: Optional[float] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._force = False
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        """加载版本缓存"""
+        try:
+            if self.cache_file.exists():
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"加载模型更新缓存失败: {str(e)}")
+        return {}
+
+    def _save_cache(self):
+        """保存版本缓存"""
+        try:
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"保存模型更新缓存失败: {str(e)}")
+
+    def _get_settings(self) -> Dict[str, Any]:
+        """读取更新检查相关配置"""
+        config = self.config_manager.get_config()
+        return {
+            "enabled": config.get("model_update_check_enabled", True),
+            "ttl": config.get("model_update_ttl_hours", 24) * 3600,
+        }
+
+    async def start(self):
+        """启动后台检查，先将已缓存的结果写入模型库"""
+        if self._running:
+            return
+        self.manager.set_model_updates(self.cache)
+        self._running = True
+        self._task = asyncio.create_task(self._check_loop())
+        self.logger.info("模型更新检查服务已启动")
+
+    async def stop(self):
+        """停止后台检查"""
+        if not self._running:
+            return
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.logger.info("模型更新检查服务已停止")
+
+    def request_check(self):
+        """立即检查全部已安装模型（忽略缓存有效期）"""
+        self._force = True
+        self._wakeup.set()
+
+    async def _check_loop(self):
+        """检查循环"""
+        while self._running:
+            try:
+                settings = self._get_settings()
+                if settings["enabled"] or self._force:
+                    await self.check_updates(0 if self._force else settings["ttl"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"检查模型更新时出错: {str(e)}")
+            finally:
+                self._force = False
+                self.checking = False
+
+            # 每小时检查一次是否有缓存过期，也可以被手动触发唤醒
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=3600)
+            except asyncio.TimeoutError:
+                pass
+
+    async def check_updates(self, ttl: float):
+        """批量查询缓存已过期的模型"""
+        now = time.time()
+        stale = [
+            model_id for model_id in self.manager.get_installed_model_ids()
+            if now - self.cache.get(model_id, {}).get("checked_at", 0) >= ttl
+        ]
+        if not stale:
+            return
+
+        self.checking = True
+        self.logger.info(f"开始检查 {len(stale)} 个模型的更新")
+        async with aiohttp.ClientSession(timeout=ClientTimeout(total=30)) as session:
+            for i in range(0, len(stale), BATCH_SIZE):
+                batch = stale[i:i + BATCH_SIZE]
+                updates = await self._fetch_batch(session, batch)
+                if updates:
+                    self.cache.update(updates)
+                    self._save_cache()
+                    self.manager.set_model_updates(updates)
+                await asyncio.sleep(REQUEST_INTERVAL)
+
+        self.last_check = time.time()
+        event_bus.publish("model_updates_checked", {"count": len(self.get_updates())})
+
+    async def _fetch_batch(self, session: aiohttp.ClientSession, model_ids: List[str]) -> Dict[str, dict]:
+        """查询一批模型的版本列表，被限流时等待后重试一次"""
+        params = {"ids": ",".join(model_ids), "limit": str(len(model_ids)), "nsfw": "true"}
+        for attempt in range(2):
+            async with session.get(f"{self.manager.api_base_url}/models", params=params) as response:
+                if response.status == 429 and attempt == 0:
+                    retry_after = response.headers.get("Retry-After", "")
+                    await asyncio.sleep(int(retry_after) if retry_after.isdigit() else RATE_LIMIT_BACKOFF)
+                    continue
+                if response.status != 200:
+                    self.logger.warning(f"查询模型更新失败，状态码: {response.status}")
+                    return {}
+                items = (await response.json()).get("items") or []
+                break
+        else:
+            return {}
+
+        checked_at = time.time()
+        updates = {}
+        for item in items:
+            versions = item.get("modelVersions") or []
+            if not versions:
+                continue
+            latest = versions[0]
+            updates[str(item["id"])] = {
+                "checked_at": checked_at,
+                "version_ids": [version.get("id") for version in versions],
+                "latest_version": {
+                    "id": latest.get("id"),
+                    "name": latest.get("name"),
+                    "baseModel": latest.get("baseModel"),
+                    "publishedAt": latest.get("publishedAt"),
+                },
+            }
+        # 查询不到的模型（已删除或隐藏）也记录检查时间，避免反复查询
+        for model_id in model_ids:
+            updates.setdefault(model_id, {"checked_at": checked_at, "version_ids": [], "latest_version": None})
+        return updates
+
+    def get_updates(self) -> list:
+        """列出有新版本的已安装模型"""
+        return [
+            record for record in self.manager.get_all_models_info()
+            if record.get("update_available")
+        ]
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取检查状态和有更新的模型"""
+        items = self.get_updates()
+        return {
+            "running": self._running,
+            "checking": self.checking,
+            "last_check": self.last_check,
+            "cached_models": len(self.cache),
+            "update_count": len(items),
+            "items": items,
+        }
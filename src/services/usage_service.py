@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.core.event_bus import event_bus
+from src.utils.png_metadata import PngMetadataError, extract_model_refs, read_png_text
+
+# A1111的模型哈希（AutoV2）为SHA256的前10位。LoRA哈希（AutoV3）只对张量数据计算，
+# 与整个文件的SHA256无关，LoRA引用只能按文件名匹配
+HASH_PREFIX_LENGTH = 10
+
+
+class UsageService:
+    """模型使用统计
+
+    遍历输出目录中的PNG图片，读取生成参数中的模型和LoRA引用，统计每个模型的使用次数和最后使用时间。
+    索引按文件修改时间增量更新，只解析新增或修改过的图片；引用在查询时才与模型库匹配，
+    之后新增的模型也能匹配到以前生成的图片。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.config_manager = manager.config_manager
+        self.logger = logging.getLogger(__name__)
+        self.index_file = manager.data_dir / "usage_index.json"
+        # 图片路径 -> [修改时间, [[类型, 名称, 哈希], ...]]
+        self.images: Dict[str, list] = self._load_index()
+        self.indexing = False
+        self.progress = {"scanned": 0, "parsed": 0}
+        self.last_index: Optional[float] = None
+        self._index_version = 0
+        self._usage_cache: Optional[Tuple[tuple, Dict[str, dict]]] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def _load_index(self) -> Dict[str, list]:
+        """加载图片索引"""
+        try:
+            if self.index_file.exists():
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"加载使用统计索引失败: {str(e)}")
+        return {}
+
+    def _save_index(self):
+        """保存图片索引"""
+        try:
+            with open(self.index_file, "w", encoding="utf-8") as f:
+                json.dump(self.images, f, ensure_ascii=False, separators=(",", ":"))
+        except Exception as e:
+            self.logger.error(f"保存使用统计索引失败: {str(e)}")
+
+    def get_output_dirs(self) -> List[Path]:
+        """获取要统计的输出目录，未配置时使用模型目录旁边的 output（ComfyUI目录结构）"""
+        output_dirs = self.config_manager.get_config().get("output_dirs")
+        if output_dirs:
+            return [Path(path) for path in output_dirs]
+        if self.manager.models_path:
+            default_dir = Path(self.manager.models_path).parent / "output"
+            if default_dir.is_dir():
+                return [default_dir]
+        return []
+
+    async def start(self):
+        """启动定时索引"""
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._index_loop())
+        self.logger.info("模型使用统计服务已启动")
+
+    async def stop(self):
+        """停止定时索引"""
+        if not self._running:
+            return
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.logger.info("模型使用统计服务已停止")
+
+    def request_index(self):
+        """立即更新索引"""
+        self._wakeup.set()
+
+    async def _index_loop(self):
+        """索引循环"""
+        while self._running:
+            try:
+                if self.get_output_dirs():
+                    await asyncio.to_thread(self.run_index)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"更新使用统计索引时出错: {str(e)}")
+
+            interval = self.config_manager.get_config().get("usage_index_interval_hours", 6) * 3600
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    def _iter_png_files(root: Path) -> Iterator[os.DirEntry]:
+        """遍历目录下的PNG文件"""
+        stack = [str(root)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith(".png"):
+                            yield entry
+            except OSError:
+                continue
+
+    def run_index(self):
+        """增量更新图片索引（在工作线程中执行）"""
+        if self.indexing:
+            return
+        self.indexing = True
+        self.progress = {"scanned": 0, "parsed": 0}
+        try:
+            # 在新字典中建立索引后整体替换，查询时遍历的字典不会被修改
+            old_images = self.images
+            images: Dict[str, list] = {}
+            for output_dir in self.get_output_dirs():
+                if not output_dir.is_dir():
+                    # 目录暂时不可用（如移动硬盘未连接）时保留原有记录
+                    prefix = os.path.join(str(output_dir), "")
+                    images.update((path, value) for path, value in old_images.items() if path.startswith(prefix))
+                    continue
+                for entry in self._iter_png_files(output_dir):
+                    self.progress["scanned"] += 1
+                    try:
+                        mtime = entry.stat().st_mtime
+                    except OSError:
+                        continue
+                    cached = old_images.get(entry.path)
+                    if cached and cached[0] == mtime:
+                        images[entry.path] = cached
+                        continue
+                    try:
+                        refs = extract_model_refs(read_png_text(entry.path))
+                    except (OSError, PngMetadataError):
+                        refs = []
+                    images[entry.path] = [
+                        mtime, [[ref["kind"], ref.get("name"), ref.get("hash")] for ref in refs]
+                    ]
+                    self.progress["parsed"] += 1
+
+            # 已删除或不再统计的目录中的图片不会写入新索引
+            self.images = images
+            self._save_index()
+            self._index_version += 1
+            self.last_index = time.time()
+            self.logger.info(
+                f"使用统计索引已更新: {self.progress['scanned']} 张图片，解析 {self.progress['parsed']} 张"
+            )
+            event_bus.publish("usage_indexed", {
+                "image_count": len(self.images), "parsed": self.progress["parsed"]
+            })
+        finally:
+            self.indexing = False
+
+    def _build_usage(self) -> Dict[str, dict]:
+        """将图片中的引用与模型库匹配，汇总每个模型的使用次数和最后使用时间"""
+        snapshot = self.manager.snapshot
+        cache_key = (snapshot.instance_id, snapshot.version, self._index_version)
+        # 索引更新时整体替换字典，取当前引用即可安全遍历
+        images = self.images
+        if self._usage_cache and self._usage_cache[0] == cache_key:
+            return self._usage_cache[1]
+
+        by_hash: Dict[str, List[Tuple[str, str]]] = {}
+        by_name: Dict[str, List[str]] = {}
+        for model_path, entry in snapshot.entries.items():
+            model_hash = (entry.get("hash") or "").lower()
+            if model_hash:
+                by_hash.setdefault(model_hash[:HASH_PREFIX_LENGTH], []).append((model_hash, model_path))
+            by_name.setdefault(Path(model_path).stem.lower(), []).append(model_path)
+
+        def resolve(kind: str, name: Optional[str], ref_hash: Optional[str]) -> List[str]:
+            # 大模型优先按哈希匹配，同名模型存在多个版本时更准确
+            ref_hash = (ref_hash or "").lower()
+            if kind == "checkpoint" and len(ref_hash) >= HASH_PREFIX_LENGTH:
+                matched = [path for full_hash, path in by_hash.get(ref_hash[:HASH_PREFIX_LENGTH], ())
+                           if full_hash.startswith(ref_hash)]
+                if matched:
+                    return matched
+            return by_name.get((name or "").lower(), [])
+
+        usage: Dict[str, dict] = {}
+        for mtime, refs in images.values():
+            # 同一张图片对同一模型的多次引用只计一次
+            model_paths = {path for kind, name, ref_hash in refs for path in resolve(kind, name, ref_hash)}
+            for model_path in model_paths:
+                stats = usage.setdefault(model_path, {"use_count": 0, "last_used": None})
+                stats["use_count"] += 1
+                if stats["last_used"] is None or mtime > stats["last_used"]:
+                    stats["last_used"] = mtime
+
+        self._usage_cache = (cache_key, usage)
+        return usage
+
+    def get_usage(self, sort: str = "last_used", unused_days: Optional[int] = None) -> Dict[str, Any]:
+        """获取当前模型目录下每个模型的使用统计
+
+        Args:
+            sort: 排序方式，last_used（最近使用在前）、use_count（使用次数多在前）或 size（占用大在前）
+            unused_days: 只返回超过指定天数未使用（或从未使用）的模型
+        """
+        usage = self._build_usage()
+        items = [
+            {**record, **usage.get(record["path"], {"use_count": 0, "last_used": None})}
+            for record in self.manager.get_all_models_info()
+        ]
+        if unused_days is not None:
+            cutoff = time.time() - unused_days * 86400
+            items = [item for item in items if item["last_used"] is None or item["last_used"] < cutoff]
+
+        sort_keys = {
+            "last_used": lambda item: item["last_used"] or 0,
+            "use_count": lambda item: item["use_count"],
+            "size": lambda item: item.get("size") or 0,
+        }
+        items.sort(key=sort_keys.get(sort, sort_keys["last_used"]), reverse=True)
+        return {
+            "indexing": self.indexing,
+            "progress": self.progress,
+            "last_index": self.last_index,
+            "output_dirs": [str(path) for path in self.get_output_dirs()],
+            "image_count": len(self.images),
+            "model_count": len(items),
+            "total_bytes": sum(item.get("size") or 0 for item in items),
+            "items": items,
+        }
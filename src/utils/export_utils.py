@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+from typing import Iterable, List
+
+# 每次向客户端写出的记录条数
+EXPORT_CHUNK_SIZE = 200
+
+
+def iter_ndjson(records: Iterable[dict]):
+    """将记录流编码为NDJSON文本块"""
+    buffer = []
+    for record in records:
+        buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def iter_json_array(records: Iterable[dict]):
+    """将记录流编码为JSON数组文本块"""
+    yield "["
+    buffer = []
+    first = True
+    for record in records:
+        buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield ("" if first else ",") + ",".join(buffer)
+            buffer = []
+            first = False
+    if buffer:
+        yield ("" if first else ",") + ",".join(buffer)
+    yield "]"
+
+
+def iter_csv(records: Iterable[dict], fieldnames: List[str]):
+    """将记录流编码为CSV文本块"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+        if count >= EXPORT_CHUNK_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+            count = 0
+    yield output.getvalue()
@@ -0,0 +1,50 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+# 要求客户端每次都向服务器验证缓存，配合ETag返回304
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """根据版本号等信息生成弱ETag"""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def content_etag(content: Any) -> str:
+    """根据JSON内容的哈希生成弱ETag，适用于体积较小的响应"""
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+    return make_etag(hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16])
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """检查请求的If-None-Match是否与当前ETag一致"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # 比较时忽略弱校验前缀
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def etag_json_response(request: Request, etag: str, build_content,
+                       headers: Optional[Dict[str, str]] = None) -> Response:
+    """支持条件GET的JSON响应
+
+    Args:
+        request: 当前请求
+        etag: 当前资源的ETag
+        build_content: 生成响应内容的函数，仅在需要返回完整内容时调用
+        headers: 额外的响应头
+
+    Returns:
+        Response: 未修改时返回304，否则返回带ETag的JSON响应
+    """
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=build_content(), headers=headers)
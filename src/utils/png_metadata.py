@@ -0,0 +1,155 @@
+import json
+import re
+import struct
+import zlib
+from pathlib import PurePath
+from typing import Any, Dict, Iterator, List
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# 单个文本块的大小上限，防止损坏的文件导致读取超大数据
+MAX_TEXT_CHUNK_SIZE = 16 * 1024 * 1024
+# 可以被引用的模型文件扩展名
+MODEL_EXTENSIONS = (".safetensors", ".ckpt", ".pt", ".pth", ".bin")
+
+_A1111_PARAM_RE = re.compile(r'\s*([\w ]+):\s*("(?:\\.|[^\\"])*"|[^,]*)(?:,|$)')
+_EXTRA_NETWORK_RE = re.compile(r"<(?:lora|lyco):([^:>]+)(?::[^>]*)?>", re.IGNORECASE)
+
+
+class PngMetadataError(Exception):
+    """PNG元数据读取错误"""
+    pass
+
+
+def read_png_text(file_path) -> Dict[str, str]:
+    """读取PNG中的 tEXt、zTXt 和 iTXt 文本块，不解码像素数据
+
+    逐块读取块头，遇到图像数据块（IDAT）即停止：A1111和ComfyUI都把参数写在图像数据之前，
+    这样每张图片只需读取开头的几KB。
+    """
+    texts: Dict[str, str] = {}
+    with open(file_path, "rb") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            raise PngMetadataError("不是有效的PNG文件")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type in (b"IDAT", b"IEND"):
+                break
+            if chunk_type not in (b"tEXt", b"zTXt", b"iTXt") or length > MAX_TEXT_CHUNK_SIZE:
+                f.seek(length + 4, 1)  # 跳过数据和CRC
+                continue
+            data = f.read(length)
+            f.seek(4, 1)
+            try:
+                keyword, text = _decode_text_chunk(chunk_type, data)
+            except (ValueError, zlib.error):
+                continue
+            texts[keyword] = text
+    return texts
+
+
+def _decode_text_chunk(chunk_type: bytes, data: bytes):
+    """解码文本块，返回 (关键字, 文本)"""
+    keyword, _, rest = data.partition(b"\0")
+    keyword = keyword.decode("latin-1")
+    if chunk_type == b"tEXt":
+        return keyword, rest.decode("latin-1")
+    if chunk_type == b"zTXt":
+        # 第一个字节为压缩方式，只定义了zlib
+        return keyword, zlib.decompress(rest[1:]).decode("latin-1")
+    # iTXt: 压缩标志、压缩方式、语言标签\0、翻译后的关键字\0、UTF-8文本
+    if len(rest) < 2:
+        # 空的或被截断的块，由调用方跳过
+        raise ValueError("iTXt文本块不完整")
+    compressed = rest[0]
+    _, _, rest = rest[2:].partition(b"\0")
+    _, _, text = rest.partition(b"\0")
+    if compressed:
+        text = zlib.decompress(text)
+    return keyword, text.decode("utf-8")
+
+
+def _model_name(value: str) -> str:
+    """取模型引用的文件名（去掉目录和扩展名）"""
+    name = PurePath(value.replace("\\", "/")).name
+    for ext in MODEL_EXTENSIONS:
+        if name.lower().endswith(ext):
+            return name[:-len(ext)]
+    return name
+
+
+def parse_a1111_parameters(text: str) -> List[Dict[str, str]]:
+    """解析A1111 parameters 文本中的模型和LoRA引用
+
+    Returns:
+        list: 引用列表，每项包含 kind（checkpoint/lora）以及 name 和/或 hash
+    """
+    refs = []
+    lines = text.strip().split("\n")
+    # 最后一行是以逗号分隔的生成参数
+    params = {key.strip(): value.strip() for key, value in _A1111_PARAM_RE.findall(lines[-1])}
+    prompt = "\n".join(lines[:-1])
+
+    if params.get("Model hash") or params.get("Model"):
+        refs.append({"kind": "checkpoint", "name": params.get("Model"), "hash": params.get("Model hash")})
+
+    # Lora hashes: "name1: abcdef123456, name2: 0123456789ab"
+    lora_hashes = {}
+    for item in params.get("Lora hashes", "").strip('"').split(","):
+        name, _, lora_hash = item.partition(":")
+        if name.strip() and lora_hash.strip():
+            lora_hashes[name.strip()] = lora_hash.strip()
+    for name in dict.fromkeys(_EXTRA_NETWORK_RE.findall(prompt)):
+        refs.append({"kind": "lora", "name": _model_name(name.strip()), "hash": lora_hashes.pop(name.strip(), None)})
+    for name, lora_hash in lora_hashes.items():
+        refs.append({"kind": "lora", "name": name, "hash": lora_hash})
+    return refs
+
+
+def _iter_model_strings(value: Any) -> Iterator[str]:
+    """递归查找节点参数中引用模型文件的字符串"""
+    if isinstance(value, str):
+        if value.lower().endswith(MODEL_EXTENSIONS):
+            yield value
+    elif isinstance(value, dict):
+        # rgthree 等多LoRA加载节点用 on 字段表示是否启用
+        if value.get("on") is False:
+            return
+        for item in value.values():
+            yield from _iter_model_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_model_strings(item)
+
+
+def parse_comfyui_metadata(prompt: str = None, workflow: str = None) -> List[Dict[str, str]]:
+    """解析ComfyUI写入的 prompt（实际执行的节点）或 workflow（编辑器中的节点）中的模型引用"""
+    refs = []
+    if prompt:
+        nodes = json.loads(prompt)
+        values = [node.get("inputs", {}) for node in nodes.values() if isinstance(node, dict)]
+    elif workflow:
+        # 跳过被静音（mode 2）或绕过（mode 4）的节点
+        nodes = json.loads(workflow).get("nodes") or []
+        values = [node.get("widgets_values") for node in nodes if node.get("mode", 0) not in (2, 4)]
+    else:
+        return refs
+
+    for value in values:
+        for model_file in _iter_model_strings(value):
+            refs.append({"kind": "model", "name": _model_name(model_file)})
+    return refs
+
+
+def extract_model_refs(texts: Dict[str, str]) -> List[Dict[str, str]]:
+    """从PNG文本块中提取模型引用"""
+    try:
+        if "parameters" in texts:
+            return parse_a1111_parameters(texts["parameters"])
+        if "prompt" in texts or "workflow" in texts:
+            return parse_comfyui_metadata(texts.get("prompt"), texts.get("workflow"))
+    except (ValueError, AttributeError, IndexError):
+        pass
+    return []
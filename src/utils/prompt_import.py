@@ -0,0 +1,156 @@
+import csv
+import json
+from typing import Dict, Iterator, Optional, TextIO
+
+# 支持的导入格式
+IMPORT_FORMATS = ("csv", "json", "ndjson", "danbooru")
+# 读取JSON数组时每次读取的字符数
+JSON_READ_SIZE = 64 * 1024
+# danbooru 标签类型对应的分类
+DANBOORU_CATEGORIES = {
+    "0": "通用",
+    "1": "艺术家",
+    "3": "版权",
+    "4": "角色",
+    "5": "元数据",
+}
+# CSV表头的别名（不区分大小写）
+CSV_FIELD_ALIASES = {
+    "chinese": "chinese", "中文": "chinese", "zh": "chinese",
+    "english": "english", "英文": "english", "en": "english", "tag": "english",
+    "category": "category", "分类": "category",
+    "subcategory": "subCategory", "子分类": "subCategory",
+}
+
+
+class PromptImportError(Exception):
+    """提示词导入文件格式错误"""
+    pass
+
+
+def _normalize_row(row: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """整理导入的行，缺少英文时返回None；缺少中文时使用英文"""
+    english = str(row.get("english") or "").strip()
+    if not english:
+        return None
+    return {
+        "chinese": str(row.get("chinese") or "").strip() or english,
+        "english": english,
+        "category": str(row.get("category") or "").strip(),
+        "subCategory": str(row.get("subCategory") or "").strip(),
+    }
+
+
+def _iter_csv(f: TextIO) -> Iterator[Optional[Dict[str, str]]]:
+    """带表头的CSV，列名为 chinese、english、category、subCategory 或其别名"""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    fields = [CSV_FIELD_ALIASES.get(name.strip().lower()) for name in header]
+    if "english" not in fields:
+        raise PromptImportError("CSV表头中缺少 english 列")
+    for values in reader:
+        yield _normalize_row({field: value for field, value in zip(fields, values) if field})
+
+
+def _iter_danbooru(f: TextIO) -> Iterator[Optional[Dict[str, str]]]:
+    """标签补全插件使用的 danbooru 标签表：标签,类型,数量[,别名][,中文翻译]，没有表头"""
+    for values in csv.reader(f):
+        if not values:
+            continue
+        yield _normalize_row({
+            "english": values[0],
+            "category": DANBOORU_CATEGORIES.get(values[1].strip(), "") if len(values) > 1 else "",
+            "chinese": values[4] if len(values) > 4 else "",
+        })
+
+
+def _iter_ndjson(f: TextIO) -> Iterator[Optional[Dict[str, str]]]:
+    """每行一个JSON对象"""
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise PromptImportError(f"第{line_number}行不是有效的JSON: {str(e)}")
+        yield _normalize_row(item) if isinstance(item, dict) else None
+
+
+def _iter_json_array(f: TextIO) -> Iterator[Optional[Dict[str, str]]]:
+    """JSON数组（与 prompt_library.json 相同的结构），逐个解码数组元素，不需要一次读入整个文件"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0  # 缓冲区中尚未处理内容的起始位置，只在读入新内容时才丢弃已处理的部分
+    eof = False
+    started = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = f.read(JSON_READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return bool(chunk)
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos == len(buffer):
+            if eof or not fill():
+                raise PromptImportError("JSON数组不完整")
+            continue
+        char = buffer[pos]
+        if not started:
+            if char != "[":
+                raise PromptImportError("JSON文件必须是数组")
+            pos += 1
+            started = True
+            continue
+        if char == "]":
+            return
+        if char == ",":
+            pos += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            # 元素可能被截断在两次读取之间，读入更多内容后重试
+            if not eof and fill():
+                continue
+            raise PromptImportError(f"JSON格式错误: {str(e)}")
+        if end == len(buffer) and not eof:
+            # 数字等元素可能尚未读完整
+            if fill():
+                continue
+        pos = end
+        yield _normalize_row(item) if isinstance(item, dict) else None
+
+
+def iter_import_rows(f: TextIO, format: str) -> Iterator[Optional[Dict[str, str]]]:
+    """逐行读取导入文件
+
+    Args:
+        f: 文本文件对象
+        format: 文件格式，csv、json、ndjson 或 danbooru
+
+    Yields:
+        dict: 包含 chinese、english、category、subCategory 的项目；无效的行为None
+
+    Raises:
+        PromptImportError: 文件格式错误
+    """
+    readers = {
+        "csv": _iter_csv,
+        "json": _iter_json_array,
+        "ndjson": _iter_ndjson,
+        "danbooru": _iter_danbooru,
+    }
+    if format not in readers:
+        raise PromptImportError(f"不支持的导入格式: {format}")
+    try:
+        yield from readers[format](f)
+    except csv.Error as e:
+        raise PromptImportError(f"CSV格式错误: {str(e)}")
@@ -0,0 +1,294 @@
+import json
+import struct
+import hashlib
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# 头部长度上限，防止损坏的文件导致读取超大数据
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+# 结构签名的桶数量
+SIGNATURE_BUCKETS = 64
+# 保留的训练标签数量上限
+MAX_TAGS = 200
+# 精度转换支持的目标类型
+CONVERT_TARGETS = ("F16", "BF16")
+# 精度转换时每次处理的元素数量，限制内存占用
+CONVERT_CHUNK_ELEMENTS = 4 * 1024 * 1024
+# 转换后与原始权重比对的相对误差上限（fp16尾数10位，bf16尾数7位）
+CONVERT_TOLERANCES = {"F16": 1 / 1024, "BF16": 1 / 128}
+
+
+class SafetensorsHeaderError(Exception):
+    """safetensors头部解析错误"""
+    pass
+
+
+class SafetensorsConversionError(Exception):
+    """safetensors精度转换错误"""
+    pass
+
+
+def read_safetensors_header(file_path: Path) -> Dict[str, Any]:
+    """读取safetensors文件头部（仅读取头部，不加载权重）
+
+    Returns:
+        dict: 包含 header（张量描述和 __metadata__）和 data_offset（数据区起始位置）
+    """
+    with open(file_path, "rb") as f:
+        raw_size = f.read(8)
+        if len(raw_size) != 8:
+            raise SafetensorsHeaderError("文件过小，不是有效的safetensors文件")
+        header_size = struct.unpack("<Q", raw_size)[0]
+        if header_size <= 0 or header_size > MAX_HEADER_SIZE:
+            raise SafetensorsHeaderError(f"头部长度无效: {header_size}")
+        raw_header = f.read(header_size)
+        if len(raw_header) != header_size:
+            raise SafetensorsHeaderError("头部数据不完整")
+    try:
+        header = json.loads(raw_header)
+    except ValueError as e:
+        raise SafetensorsHeaderError(f"头部JSON解析失败: {str(e)}")
+    return {"header": header, "data_offset": 8 + header_size}
+
+
+def parse_tag_frequency(metadata: Dict[str, Any]) -> Dict[str, int]:
+    """解析训练元数据中的 ss_tag_frequency，合并各数据集的标签计数"""
+    raw = metadata.get("ss_tag_frequency")
+    if not raw:
+        return {}
+    try:
+        datasets = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return {}
+
+    counts = Counter()
+    if isinstance(datasets, dict):
+        for tags in datasets.values():
+            if not isinstance(tags, dict):
+                continue
+            for tag, count in tags.items():
+                tag = str(tag).strip()
+                if tag:
+                    try:
+                        counts[tag] += int(count)
+                    except (TypeError, ValueError):
+                        continue
+    return dict(counts.most_common(MAX_TAGS))
+
+
+def _to_number(value: Any):
+    """将元数据中的字符串数值转换为数字"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def summarize_header(header: Dict[str, Any]) -> Dict[str, Any]:
+    """从safetensors头部提取精度、网络参数、训练标签和结构签名"""
+    metadata = header.get("__metadata__") or {}
+    tensors = {name: spec for name, spec in header.items() if name != "__metadata__"}
+
+    dtype_bytes = Counter()
+    features: List[str] = []
+    lora_dims = Counter()
+    for name, spec in tensors.items():
+        dtype = spec.get("dtype", "")
+        shape = spec.get("shape", [])
+        start, end = spec.get("data_offsets", [0, 0])
+        dtype_bytes[dtype] += end - start
+        features.append(f"{name}|{'x'.join(map(str, shape))}|{dtype}")
+        # 从 lora_down 权重推断网络维度
+        if "lora_down" in name and shape:
+            lora_dims[shape[0]] += 1
+
+    # 将张量特征哈希到固定数量的桶中，作为紧凑的结构签名
+    signature = [0] * SIGNATURE_BUCKETS
+    for feature in features:
+        signature[zlib.crc32(feature.encode("utf-8")) % SIGNATURE_BUCKETS] += 1
+    digest = hashlib.sha1("\n".join(sorted(features)).encode("utf-8")).hexdigest()
+
+    network_dim = _to_number(metadata.get("ss_network_dim"))
+    if network_dim is None and lora_dims:
+        network_dim = lora_dims.most_common(1)[0][0]
+
+    return {
+        "tensor_count": len(tensors),
+        "dtype_bytes": dict(dtype_bytes),
+        "network_module": metadata.get("ss_network_module"),
+        "network_dim": network_dim,
+        "network_alpha": _to_number(metadata.get("ss_network_alpha")),
+        "base_model_version": metadata.get("ss_base_model_version"),
+        "tag_frequency": parse_tag_frequency(metadata),
+        "signature": signature,
+        "signature_digest": digest,
+    }
+
+
+def read_header_summary(file_path: Path) -> Dict[str, Any]:
+    """读取文件头部并生成摘要"""
+    return summarize_header(read_safetensors_header(file_path)["header"])
+
+
+def _to_bf16_bits(values: np.ndarray) -> np.ndarray:
+    """将float32按最近偶数舍入截断为bfloat16的位表示"""
+    bits = values.view("<u4")
+    rounded = ((bits + 0x7FFF + ((bits >> 16) & 1)) >> 16).astype("<u2")
+    # NaN加上舍入量可能溢出，单独保留为静默NaN
+    return np.where(np.isnan(values), np.uint16(0x7FC0), rounded).astype("<u2")
+
+
+def _from_bf16_bits(bits: np.ndarray) -> np.ndarray:
+    """将bfloat16位表示还原为float32"""
+    return (bits.astype("<u4") << 16).view("<f4")
+
+
+def _cast_chunk(values: np.ndarray, target: str) -> np.ndarray:
+    """将一块float32数据转换为目标精度"""
+    if target == "F16":
+        with np.errstate(over="ignore"):
+            converted = values.astype("<f2")
+        # fp16最大约为65504，超出范围会变成inf
+        if not np.isfinite(converted[np.isfinite(values)]).all():
+            raise SafetensorsConversionError("权重超出fp16范围，请改用bf16")
+        return converted
+    return _to_bf16_bits(values)
+
+
+def _restore_chunk(raw: np.ndarray, target: str) -> np.ndarray:
+    """将目标精度的原始字节还原为float32，用于校验"""
+    if target == "F16":
+        return raw.view("<f2").astype("<f4")
+    return _from_bf16_bits(raw.view("<u2"))
+
+
+def _iter_tensors(header: Dict[str, Any]):
+    """按数据区偏移顺序遍历张量"""
+    tensors = [(name, spec) for name, spec in header.items() if name != "__metadata__"]
+    return sorted(tensors, key=lambda item: item[1]["data_offsets"][0])
+
+
+def _encode_header(header: Dict[str, Any]) -> bytes:
+    """序列化头部并按8字节对齐（与safetensors库一致，用空格填充）"""
+    raw = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    raw += b" " * (-len(raw) % 8)
+    return struct.pack("<Q", len(raw)) + raw
+
+
+def convert_safetensors(source: Path, target_path: Path, target: str = "F16",
+                        progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+    """将safetensors文件中的F32张量转换为F16或BF16并写入新文件
+
+    通过内存映射逐块读取和转换，不会把整个模型加载到内存。其他类型的张量原样复制。
+    写入的同时计算新文件的SHA256。
+
+    Returns:
+        dict: 包含 hash、size、converted_tensors
+    """
+    if target not in CONVERT_TARGETS:
+        raise SafetensorsConversionError(f"不支持的目标精度: {target}")
+
+    parsed = read_safetensors_header(source)
+    tensors = _iter_tensors(parsed["header"])
+    if not any(spec.get("dtype") == "F32" for _, spec in tensors):
+        raise SafetensorsConversionError("模型中没有fp32权重，无需转换")
+
+    # 计算转换后的头部和偏移
+    new_header: Dict[str, Any] = {}
+    if "__metadata__" in parsed["header"]:
+        new_header["__metadata__"] = parsed["header"]["__metadata__"]
+    offset = 0
+    for name, spec in tensors:
+        start, end = spec["data_offsets"]
+        size = end - start
+        dtype = spec["dtype"]
+        if dtype == "F32":
+            size //= 2
+            dtype = target
+        new_header[name] = {**spec, "dtype": dtype, "data_offsets": [offset, offset + size]}
+        offset += size
+
+    sha256_hash = hashlib.sha256()
+    total = sum(spec["data_offsets"][1] - spec["data_offsets"][0] for _, spec in tensors) or 1
+    done = 0
+    converted = 0
+    data = np.memmap(source, dtype=np.uint8, mode="r", offset=parsed["data_offset"])
+    try:
+        with open(target_path, "wb") as f:
+            def write(chunk: bytes):
+                f.write(chunk)
+                sha256_hash.update(chunk)
+
+            write(_encode_header(new_header))
+            for name, spec in tensors:
+                start, end = spec["data_offsets"]
+                if spec["dtype"] != "F32":
+                    write(data[start:end].tobytes())
+                else:
+                    values = data[start:end].view("<f4")
+                    for i in range(0, len(values), CONVERT_CHUNK_ELEMENTS):
+                        write(_cast_chunk(values[i:i + CONVERT_CHUNK_ELEMENTS], target).tobytes())
+                    converted += 1
+                done += end - start
+                if progress:
+                    progress(done / total)
+    finally:
+        del data
+
+    return {
+        "hash": sha256_hash.hexdigest(),
+        "size": Path(target_path).stat().st_size,
+        "converted_tensors": converted,
+    }
+
+
+def verify_conversion(source: Path, converted_path: Path, target: str = "F16",
+                      progress: Optional[Callable[[float], None]] = None):
+    """逐块比对转换结果与原始权重，确认张量完整且误差在精度允许范围内
+
+    Raises:
+        SafetensorsConversionError: 校验失败
+    """
+    source_parsed = read_safetensors_header(source)
+    target_parsed = read_safetensors_header(converted_path)
+    source_tensors = dict(_iter_tensors(source_parsed["header"]))
+    target_tensors = dict(_iter_tensors(target_parsed["header"]))
+    if source_tensors.keys() != target_tensors.keys():
+        raise SafetensorsConversionError("转换后的张量列表与原文件不一致")
+
+    data_size = max((spec["data_offsets"][1] for spec in target_tensors.values()), default=0)
+    if Path(converted_path).stat().st_size != target_parsed["data_offset"] + data_size:
+        raise SafetensorsConversionError("转换后的文件大小与头部描述不一致")
+
+    tolerance = CONVERT_TOLERANCES[target]
+    total = len(source_tensors) or 1
+    source_data = np.memmap(source, dtype=np.uint8, mode="r", offset=source_parsed["data_offset"])
+    target_data = np.memmap(converted_path, dtype=np.uint8, mode="r", offset=target_parsed["data_offset"])
+    try:
+        for index, (name, spec) in enumerate(source_tensors.items(), 1):
+            new_spec = target_tensors[name]
+            if new_spec.get("shape") != spec.get("shape"):
+                raise SafetensorsConversionError(f"张量形状不一致: {name}")
+            start, end = spec["data_offsets"]
+            new_start, new_end = new_spec["data_offsets"]
+            if spec["dtype"] != "F32":
+                if not np.array_equal(source_data[start:end], target_data[new_start:new_end]):
+                    raise SafetensorsConversionError(f"张量数据不一致: {name}")
+            else:
+                values = source_data[start:end].view("<f4")
+                restored = target_data[new_start:new_end]
+                for i in range(0, len(values), CONVERT_CHUNK_ELEMENTS):
+                    expected = values[i:i + CONVERT_CHUNK_ELEMENTS]
+                    actual = _restore_chunk(restored[i * 2:(i + len(expected)) * 2], target)
+                    # 绝对误差项用于容纳被截断为次正规数或零的极小值
+                    if not np.allclose(actual, expected, rtol=tolerance, atol=1e-6, equal_nan=True):
+                        raise SafetensorsConversionError(f"张量数值误差超出范围: {name}")
+            if progress:
+                progress(index / total)
+    finally:
+        del source_data, target_data
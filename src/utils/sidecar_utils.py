@@ -0,0 +1,145 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# 预览图文件名后缀，按优先级排列（Civitai Helper、Stability Matrix 和 A1111 的命名方式）
+PREVIEW_SUFFIXES = (
+    ".preview.png", ".preview.jpg", ".preview.jpeg", ".preview.webp",
+    ".png", ".jpg", ".jpeg", ".webp",
+)
+# A1111额外网络用户元数据（model.json）中的字段，同名 .json 至少包含其中之一才按该格式读取
+A1111_JSON_KEYS = ("description", "activation text", "sd version", "preferred weight", "notes")
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    """读取JSON对象，文件不存在或格式不正确时返回None"""
+    if not path.is_file():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取附属元数据失败: {path.name}, 错误: {str(e)}")
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _sibling(model_path: Path, suffix: str) -> Path:
+    """获取与模型同名、指定后缀的附属文件路径"""
+    return model_path.with_name(model_path.stem + suffix)
+
+
+def find_preview(model_path: Path) -> Optional[Path]:
+    """查找模型旁边的预览图"""
+    for suffix in PREVIEW_SUFFIXES:
+        path = _sibling(model_path, suffix)
+        if path.is_file():
+            return path
+    return None
+
+
+def _from_civitai_info(data: Dict[str, Any], filename: str) -> Tuple[Dict[str, Any], Optional[str]]:
+    """解析Civitai Helper写入的 .civitai.info（即 model-versions 接口的原始响应）
+
+    Returns:
+        tuple: (模型信息, SHA256)，只有能确定对应文件时才返回哈希
+    """
+    files = data.get("files") or []
+    matched = next((f for f in files if f.get("name") == filename), None)
+    if matched is None and len(files) == 1:
+        matched = files[0]
+    model_hash = ((matched or {}).get("hashes") or {}).get("SHA256")
+    return data, model_hash.lower() if model_hash else None
+
+
+def _from_cm_info(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """解析Stability Matrix写入的 .cm-info.json，转换为与Civitai接口一致的结构"""
+    def get(key: str, default=None):
+        # 兼容 PascalCase 和 camelCase 两种序列化方式
+        return data.get(key, data.get(key[0].lower() + key[1:], default))
+
+    info = {
+        "id": get("VersionId"),
+        "modelId": get("ModelId"),
+        "name": get("VersionName"),
+        "description": get("VersionDescription"),
+        "baseModel": get("BaseModel"),
+        "trainedWords": get("TrainedWords") or [],
+        "model": {
+            "name": get("ModelName"),
+            "type": get("ModelType"),
+            "nsfw": bool(get("Nsfw", False)),
+            "tags": get("Tags") or [],
+            "description": get("ModelDescription"),
+        },
+    }
+    thumbnail = get("ThumbnailImageUrl")
+    if thumbnail:
+        info["images"] = [{"url": thumbnail}]
+    # 去掉缺失的字段，避免覆盖显示时的默认值
+    info = {key: value for key, value in info.items() if value is not None}
+    info["model"] = {key: value for key, value in info["model"].items() if value is not None}
+    model_hash = (get("Hashes") or {}).get("SHA256")
+    return info, model_hash.lower() if model_hash else None
+
+
+def merge_a1111_json(info: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """合并A1111额外网络的用户元数据（model.json），只补充缺失的字段"""
+    info = dict(info)
+    activation_text = data.get("activation text")
+    if activation_text and not info.get("trainedWords"):
+        info["trainedWords"] = [activation_text]
+    if data.get("description") and not info.get("description"):
+        info["description"] = data["description"]
+    if data.get("sd version") and not info.get("baseModel"):
+        info["baseModel"] = data["sd version"]
+    for key in ("preferred weight", "notes"):
+        if data.get(key):
+            info.setdefault("user_metadata", {})[key] = data[key]
+    return info
+
+
+def read_sidecar_metadata(model_path: Path) -> Optional[Dict[str, Any]]:
+    """读取模型旁边的附属元数据和预览图
+
+    A1111的 model.json 只有用户填写的描述和触发词，缺少名称、类型和图片等信息，
+    不能代替Civitai信息，单独返回在 user_metadata 中，由调用方合并到查询结果。
+
+    Returns:
+        dict: 包含 info（.civitai.info 或 .cm-info.json 中的模型信息并合并了A1111元数据，
+              没有这两种文件时为None）、hash（附属文件记录的SHA256，未经校验）、
+              user_metadata（A1111元数据）、preview（预览图路径）和 sources（使用的文件）；
+              没有任何附属文件时返回None
+    """
+    model_path = Path(model_path)
+    info: Optional[Dict[str, Any]] = None
+    model_hash = None
+    sources = []
+
+    civitai_info = _read_json(_sibling(model_path, ".civitai.info"))
+    cm_info = _read_json(_sibling(model_path, ".cm-info.json"))
+    if civitai_info:
+        info, model_hash = _from_civitai_info(civitai_info, model_path.name)
+        sources.append("civitai.info")
+    elif cm_info:
+        info, model_hash = _from_cm_info(cm_info)
+        sources.append("cm-info.json")
+
+    # 其他工具也可能在模型旁边写入同名的 .json（如训练配置），不含A1111字段时忽略
+    a1111_json = _read_json(_sibling(model_path, ".json"))
+    if not (a1111_json and any(key in a1111_json for key in A1111_JSON_KEYS)):
+        a1111_json = None
+    if a1111_json and info is not None:
+        info = merge_a1111_json(info, a1111_json)
+        sources.append("json")
+
+    preview = find_preview(model_path)
+    if info is None and a1111_json is None and preview is None:
+        return None
+    return {
+        "info": info,
+        "hash": model_hash,
+        "user_metadata": a1111_json,
+        "preview": preview,
+        "sources": sources,
+    }